@@ -0,0 +1,20 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Coroutine, TypeVar
+
+T = TypeVar("T")
+
+
+def run_sync(coroutine: Coroutine[Any, Any, T]) -> T:
+    """Runs coroutine to completion from sync code, with or without a loop.
+
+    asyncio.run raises inside a running loop, as in Jupyter, there the
+    coroutine runs on a loop of its own in a worker thread and the caller
+    blocks until it is done.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
@@ -10,6 +10,8 @@ class Loc:
     root: Path = Path(os.path.dirname(__file__)).parent
     data: Path = root / "data"
     vect_db: Path = data / "vect_db"
+    crawl_cache: Path = data / "crawl_cache.json"
+    emb_cache: Path = data / "emb_cache.sqlite"
     eval_data: Path = data / "eval"
     eval_set: Path = eval_data / "eval_set.jsonl"
     results: Path = eval_data / "results"
@@ -28,7 +30,8 @@ class LLM(StrEnum):
 
 @dataclass(frozen=True)
 class Api:
-    ollama_base_url: str = "http://localhost:11434/v1"
+    ollama_url: str = "http://localhost:11434"
+    ollama_base_url: str = ollama_url + "/v1"
     ollama_api_key: str = "ollama"
 
 
@@ -53,9 +56,27 @@ class Eval:
     testset_size: int = 16
 
 
+@dataclass(frozen=True)
+class Crawl:
+    concurrency: int = 8
+    rate_per_host: float = 10.0  # request starts per second, 0 for no limit
+    timeout_s: float = 30.0
+
+
+@dataclass(frozen=True)
+class Embed:
+    batch_size: int = 32
+    concurrency: int = 4  # batches in flight
+    retry_count: int = 3
+    backoff_s: float = 0.5  # doubles on each retry, up to backoff_max_s
+    backoff_max_s: float = 8.0
+
+
 @dataclass(frozen=True)
 class Const:
     api = Api()
+    crawl = Crawl()
+    embed = Embed()
     loc = Loc()
     eval = Eval()
     model = Model()
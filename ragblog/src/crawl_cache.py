@@ -0,0 +1,90 @@
+import hashlib
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Mapping
+
+from src.logger_custom import LOGGER
+from src.post import Post
+
+
+@dataclass
+class CrawlCacheEntry:
+    etag: str | None
+    last_modified: str | None
+    content_hash: str
+    title: str
+    text: str
+
+
+class CrawlCache:
+    """HTTP validators, content hash and post of each crawled url, as JSON.
+
+    The validators turn a recrawl into conditional requests, the content hash
+    tells a changed post from a page that only changed around it.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entry_dict: Dict[str, CrawlCacheEntry] = {}
+        if self.path.exists():
+            self.load()
+
+    @staticmethod
+    def get_content_hash(post: Post) -> str:
+        return hashlib.sha256(str(post).encode()).hexdigest()
+
+    def get_header_dict(self, url: str) -> Dict[str, str]:
+        entry = self.entry_dict.get(url)
+        if entry is None:
+            return {}
+        header_dict = {}
+        if entry.etag:
+            header_dict["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            header_dict["If-Modified-Since"] = entry.last_modified
+        return header_dict
+
+    def get_post(self, url: str) -> Post:
+        entry = self.entry_dict[url]
+        return Post(title=entry.title, text=entry.text)
+
+    def update(self, url: str, header_dict: Mapping[str, str], post: Post) -> bool:
+        """Stores the post fetched from url, True if it is new or changed."""
+        content_hash = self.get_content_hash(post=post)
+        entry = self.entry_dict.get(url)
+        is_changed = entry is None or entry.content_hash != content_hash
+        self.entry_dict[url] = CrawlCacheEntry(
+            etag=header_dict.get("etag"),
+            last_modified=header_dict.get("last-modified"),
+            content_hash=content_hash,
+            title=post.title,
+            text=post.text,
+        )
+        return is_changed
+
+    def prune(self, url_list: Iterable[str]) -> None:
+        """Drops the urls not in url_list, posts no longer listed."""
+        url_set = set(url_list)
+        url_stale_list = [url for url in self.entry_dict if url not in url_set]
+        for url in url_stale_list:
+            del self.entry_dict[url]
+        if url_stale_list:
+            LOGGER.info(f"crawl cache pruned: {len(url_stale_list)} urls")
+
+    def load(self) -> None:
+        with open(self.path, "r") as f:
+            self.entry_dict = {
+                url: CrawlCacheEntry(**entry) for url, entry in json.load(f).items()
+            }
+        LOGGER.info(f"crawl cache loaded: {self.path} {len(self.entry_dict)} urls")
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(
+                {url: asdict(entry) for url, entry in self.entry_dict.items()},
+                f,
+                ensure_ascii=False,
+            )
+        LOGGER.info(f"crawl cache saved: {self.path} {len(self.entry_dict)} urls")
@@ -1,29 +1,122 @@
+import asyncio
 import os
-from typing import List
+from pathlib import Path
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
 
-import requests
+import httpx
 from bs4 import BeautifulSoup
 
+from src.async_run import run_sync
 from src.const import CONST
+from src.crawl_cache import CrawlCache
 from src.logger_custom import LOGGER, log_init
 from src.post import Post, PostEmpty
 
 
+class RateLimiter:
+    """Spaces request starts to the same host by at least 1 / rate_per_host."""
+
+    def __init__(self, rate_per_host: float):
+        self.interval_s = 1.0 / rate_per_host if rate_per_host else 0.0
+        self.next_start_dict: Dict[str, float] = {}
+
+    async def wait(self, url: str) -> None:
+        if not self.interval_s:
+            return
+        host = urlsplit(url).netloc
+        now = asyncio.get_running_loop().time()
+        start = max(now, self.next_start_dict.get(host, now))
+        # the slot is reserved before awaiting, so concurrent waits queue up
+        self.next_start_dict[host] = start + self.interval_s
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
 @log_init
 class Crawler:
-    def __init__(self, post_count_min: int):
+    def __init__(
+        self,
+        post_count_min: int,
+        url: str = "https://delightfulobservaciones.blogspot.com/",
+        concurrency: int = CONST.crawl.concurrency,
+        rate_per_host: float = CONST.crawl.rate_per_host,
+        crawl_cache_path: Path | None = CONST.loc.crawl_cache,
+    ):
         self.url_list: List[str] = []
         self.post_list: List[Post] = []
+        # new or changed since the cached crawl, all of post_list without cache
+        self.post_changed_list: List[Post] = []
 
-        self.url = "https://delightfulobservaciones.blogspot.com/"
+        self.url = url
         self.post_count_min = post_count_min
+        self.concurrency = concurrency
+        self.rate_per_host = rate_per_host
+        self.crawl_cache = (
+            CrawlCache(path=crawl_cache_path) if crawl_cache_path is not None else None
+        )
 
     def run(self):
-        self.get_url_list()
-        self.get_post_list()
+        run_sync(self.run_async())
+
+    async def run_async(self):
+        async with self.get_client() as client:
+            rate_limiter = RateLimiter(rate_per_host=self.rate_per_host)
+            await self.get_url_list_async(client=client, rate_limiter=rate_limiter)
+            await self.get_post_list_async(client=client, rate_limiter=rate_limiter)
         self.write(path=CONST.loc.data)
+        if self.crawl_cache is not None:
+            self.crawl_cache.save()
+
+    def get_client(self) -> httpx.AsyncClient:
+        """One connection pool for the crawl, sized to the concurrency."""
+        return httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=CONST.crawl.timeout_s,
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency,
+            ),
+        )
 
     def get_url_list(self) -> None:
+        run_sync(self._run_with_client(self.get_url_list_async))
+
+    def get_post_list(self) -> None:
+        run_sync(self._run_with_client(self.get_post_list_async))
+
+    async def _run_with_client(self, fn) -> None:
+        async with self.get_client() as client:
+            await fn(
+                client=client,
+                rate_limiter=RateLimiter(rate_per_host=self.rate_per_host),
+            )
+
+    async def fetch(
+        self,
+        client: httpx.AsyncClient,
+        rate_limiter: RateLimiter,
+        url: str,
+        header_dict: Dict[str, str] | None = None,
+    ) -> httpx.Response | None:
+        """200 response, or 304 to conditional headers, None otherwise."""
+        await rate_limiter.wait(url=url)
+        try:
+            response = await client.get(url, headers=header_dict)
+        except httpx.HTTPError as e:
+            LOGGER.warning(f"Failed to fetch {url}: {e!r}")
+            return None
+        if response.status_code == 304 and header_dict:
+            return response
+        if response.status_code != 200:
+            LOGGER.info(f"Failed to load {url}: {response.status_code}")
+            return None
+        return response
+
+    async def get_url_list_async(
+        self, client: httpx.AsyncClient, rate_limiter: RateLimiter
+    ) -> None:
+        """Listing pages in order, each one links the next."""
         current_url = self.url
         url_list = []
 
@@ -32,9 +125,10 @@ class Crawler:
                 break
 
             LOGGER.info(f"Fetching {current_url}")
-            response = requests.get(current_url)
-            if response.status_code != 200:
-                LOGGER.info(f"Failed to load page {current_url}")
+            response = await self.fetch(
+                client=client, rate_limiter=rate_limiter, url=current_url
+            )
+            if response is None:
                 break
 
             soup = BeautifulSoup(response.content, "html.parser")
@@ -57,12 +151,50 @@ class Crawler:
 
         self.url_list = sorted(list(set(url_list)))
 
-    def get_post_list(self) -> None:
-        self.post_list = list(
-            filter(
-                lambda post: not isinstance(post, PostEmpty),
-                map(Post.from_url, self.url_list),
+    async def get_post_list_async(
+        self, client: httpx.AsyncClient, rate_limiter: RateLimiter
+    ) -> None:
+        """Posts fetched concurrently, kept in url_list order.
+
+        With a crawl cache the requests are conditional: a 304 reuses the
+        cached post, a 200 is compared to it by content hash.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        crawl_cache = self.crawl_cache
+
+        async def get_post(url: str) -> Tuple[Post, bool]:
+            header_dict = crawl_cache.get_header_dict(url=url) if crawl_cache else {}
+            async with semaphore:
+                response = await self.fetch(
+                    client=client,
+                    rate_limiter=rate_limiter,
+                    url=url,
+                    header_dict=header_dict,
+                )
+            if response is None:
+                return PostEmpty(), False
+            if response.status_code == 304:
+                return crawl_cache.get_post(url=url), False
+            post = Post.from_content(content=response.content)
+            if crawl_cache is None or isinstance(post, PostEmpty):
+                return post, True
+            return post, crawl_cache.update(
+                url=url, header_dict=response.headers, post=post
             )
+
+        post_list = await asyncio.gather(*map(get_post, self.url_list))
+        if crawl_cache is not None:
+            crawl_cache.prune(url_list=self.url_list)
+        post_list = [
+            (post, is_changed)
+            for post, is_changed in post_list
+            if not isinstance(post, PostEmpty)
+        ]
+        self.post_list = [post for post, _ in post_list]
+        self.post_changed_list = [post for post, is_changed in post_list if is_changed]
+        LOGGER.info(
+            f"post_list: {len(self.post_list)} of {len(self.url_list)} urls, "
+            f"{len(self.post_changed_list)} new or changed"
         )
 
     def write(self, path: str):
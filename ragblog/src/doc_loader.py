@@ -18,17 +18,25 @@ class DocLoader:
     def load(self) -> List[Document]:
         loader = JSONLoader(
             file_path=CONST.loc.data / "blog.jsonl",
-            jq_schema=".text",
+            jq_schema=".",
+            content_key="text",
+            metadata_func=self.get_metadata,
             json_lines=True,
         )
         doc_list = loader.load()
 
         return self.split(doc_list=doc_list)
 
+    @staticmethod
+    def get_metadata(record: dict, metadata: dict) -> dict:
+        """Post title kept with each chunk, it names the post in VectorDB ids."""
+        return {**metadata, "title": record.get("title", "")}
+
     @staticmethod
     def split(doc_list: List[Document]) -> List[Document]:
         splitter = RecursiveCharacterTextSplitter(
             chunk_size=500,
             chunk_overlap=10,
+            add_start_index=True,
         )
         return splitter.split_documents(documents=doc_list)
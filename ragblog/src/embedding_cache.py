@@ -0,0 +1,197 @@
+import hashlib
+import sqlite3
+import threading
+from array import array
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+from src.const import CONST
+from src.logger_custom import LOGGER
+
+# sqlite host parameter limit of older builds is 999
+SELECT_BATCH_SIZE = 500
+
+
+class EmbeddingCache:
+    """Embeddings in SQLite as float32 blobs, keyed by (model, text hash).
+
+    Shared by every process and run pointing at the same file: index
+    rebuilds, eval set generation and eval runs embed a text once per model.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS embedding ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, text_hash))"
+        )
+        self.connection.commit()
+        self._lock = threading.Lock()
+        self.hit_count = 0
+        self.miss_count = 0
+
+    @staticmethod
+    def get_text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def get_vector_dict(
+        self, model: str, text_hash_list: List[str]
+    ) -> Dict[str, List[float]]:
+        """Cached vectors of text_hash_list, by text hash."""
+        text_hash_list = list(dict.fromkeys(text_hash_list))
+        vector_dict = {}
+        with self._lock:
+            for i in range(0, len(text_hash_list), SELECT_BATCH_SIZE):
+                batch = text_hash_list[i : i + SELECT_BATCH_SIZE]
+                row_list = self.connection.execute(
+                    "SELECT text_hash, vector FROM embedding "
+                    f"WHERE model = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    [model, *batch],
+                ).fetchall()
+                for text_hash, vector in row_list:
+                    vector_float32 = array("f")
+                    vector_float32.frombytes(vector)
+                    vector_dict[text_hash] = vector_float32.tolist()
+        return vector_dict
+
+    def put(self, model: str, vector_dict: Dict[str, List[float]]) -> None:
+        with self._lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO embedding (model, text_hash, vector) "
+                "VALUES (?, ?, ?)",
+                [
+                    (model, text_hash, array("f", vector).tobytes())
+                    for text_hash, vector in vector_dict.items()
+                ],
+            )
+            self.connection.commit()
+
+    def update_stats(self, model: str, hit_count: int, miss_count: int) -> None:
+        with self._lock:
+            self.hit_count += hit_count
+            self.miss_count += miss_count
+            total_count = self.hit_count + self.miss_count
+        LOGGER.info(
+            f"embedding cache {model}: hit={hit_count} miss={miss_count}, "
+            f"total hit={self.hit_count} miss={self.miss_count} "
+            f"hit_rate={self.hit_count / total_count if total_count else 0.0:.3f}"
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self.connection.close()
+
+
+class EmbeddingsCached(Embeddings):
+    """Embeddings read through an EmbeddingCache, misses go to embeddings.
+
+    Queries and documents share the cache, which holds as long as the model
+    embeds them alike, as OllamaEmbeddings does.
+    """
+
+    def __init__(self, embeddings: Embeddings, model: str, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.model = str(model)
+        self.cache = cache
+
+    def _get_miss_dict(
+        self, text_list: List[str]
+    ) -> tuple[List[str], Dict[str, List[float]], Dict[str, str]]:
+        text_hash_list = [self.cache.get_text_hash(text=text) for text in text_list]
+        vector_dict = self.cache.get_vector_dict(
+            model=self.model, text_hash_list=text_hash_list
+        )
+        # identical texts of one call are embedded once
+        miss_dict = {
+            text_hash: text
+            for text_hash, text in zip(text_hash_list, text_list)
+            if text_hash not in vector_dict
+        }
+        return text_hash_list, vector_dict, miss_dict
+
+    def _put(
+        self,
+        text_hash_list: List[str],
+        vector_dict: Dict[str, List[float]],
+        miss_dict: Dict[str, str],
+        vector_miss_list: List[List[float]],
+    ) -> List[List[float]]:
+        # float32 as stored, a text embeds the same on a hit and on a miss
+        vector_miss_dict = {
+            text_hash: array("f", vector).tolist()
+            for text_hash, vector in zip(miss_dict, vector_miss_list)
+        }
+        if vector_miss_dict:
+            self.cache.put(model=self.model, vector_dict=vector_miss_dict)
+        self.cache.update_stats(
+            model=self.model,
+            hit_count=len(text_hash_list) - len(miss_dict),
+            miss_count=len(miss_dict),
+        )
+        vector_dict.update(vector_miss_dict)
+        return [vector_dict[text_hash] for text_hash in text_hash_list]
+
+    def _embed(
+        self, text_list: List[str], embed_fn: Callable[[List[str]], List[List[float]]]
+    ) -> List[List[float]]:
+        text_hash_list, vector_dict, miss_dict = self._get_miss_dict(text_list)
+        vector_miss_list = embed_fn(list(miss_dict.values())) if miss_dict else []
+        return self._put(text_hash_list, vector_dict, miss_dict, vector_miss_list)
+
+    async def _aembed(
+        self,
+        text_list: List[str],
+        embed_fn: Callable[[List[str]], Awaitable[List[List[float]]]],
+    ) -> List[List[float]]:
+        text_hash_list, vector_dict, miss_dict = self._get_miss_dict(text_list)
+        vector_miss_list = await embed_fn(list(miss_dict.values())) if miss_dict else []
+        return self._put(text_hash_list, vector_dict, miss_dict, vector_miss_list)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(text_list=texts, embed_fn=self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(
+            text_list=[text],
+            embed_fn=lambda text_list: [self.embeddings.embed_query(text_list[0])],
+        )[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self._aembed(
+            text_list=texts, embed_fn=self.embeddings.aembed_documents
+        )
+
+    async def aembed_query(self, text: str) -> List[float]:
+        async def embed_fn(text_list: List[str]) -> List[List[float]]:
+            return [await self.embeddings.aembed_query(text_list[0])]
+
+        return (await self._aembed(text_list=[text], embed_fn=embed_fn))[0]
+
+
+_cache_dict: Dict[Path, EmbeddingCache] = {}
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache(path: Path = CONST.loc.emb_cache) -> EmbeddingCache:
+    """One EmbeddingCache per path in the process, so hit stats add up."""
+    with _cache_lock:
+        if path not in _cache_dict:
+            _cache_dict[path] = EmbeddingCache(path=path)
+        return _cache_dict[path]
+
+
+def get_embeddings_cached(
+    embeddings: Embeddings, model: str, path: Path | None = CONST.loc.emb_cache
+) -> Embeddings:
+    """embeddings behind the cache at path, as is for a None path."""
+    if path is None:
+        return embeddings
+    return EmbeddingsCached(
+        embeddings=embeddings, model=model, cache=get_embedding_cache(path=path)
+    )
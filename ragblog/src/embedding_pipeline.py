@@ -0,0 +1,149 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Sequence, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from src.async_run import run_sync
+from src.const import CONST
+from src.logger_custom import LOGGER, log_init
+
+# ids, chunks and vectors of one embedded batch
+BatchHandler = Callable[[List[str], List[Document], List[List[float]]], None]
+
+
+@dataclass
+class EmbeddingProgress:
+    chunk_count: int
+    batch_count: int
+    chunk_done_count: int = 0
+    batch_done_count: int = 0
+    retry_count: int = 0
+    time_start: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed_s(self) -> float:
+        return time.perf_counter() - self.time_start
+
+    @property
+    def chunk_per_s(self) -> float:
+        elapsed_s = self.elapsed_s
+        return self.chunk_done_count / elapsed_s if elapsed_s else 0.0
+
+    def log(self) -> None:
+        LOGGER.info(
+            f"embedding batch {self.batch_done_count}/{self.batch_count} "
+            f"chunk {self.chunk_done_count}/{self.chunk_count} "
+            f"retry={self.retry_count} elapsed={self.elapsed_s:.1f}s "
+            f"throughput={self.chunk_per_s:.1f} chunk/s"
+        )
+
+
+@log_init
+class EmbeddingPipeline:
+    """Embeds chunks in batches, several batches in flight at once.
+
+    A failed batch is retried with exponential backoff. Each embedded batch is
+    handed to on_batch as soon as it completes, so the vector store fills while
+    the next batches are embedded.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        batch_size: int = CONST.embed.batch_size,
+        concurrency: int = CONST.embed.concurrency,
+        retry_count: int = CONST.embed.retry_count,
+        backoff_s: float = CONST.embed.backoff_s,
+        backoff_max_s: float = CONST.embed.backoff_max_s,
+    ):
+        if batch_size < 1 or concurrency < 1:
+            raise ValueError(
+                f"batch_size and concurrency below 1: {batch_size} {concurrency}"
+            )
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.retry_count = retry_count
+        self.backoff_s = backoff_s
+        self.backoff_max_s = backoff_max_s
+
+    def get_batch_list(
+        self, id_list: Sequence[str], doc_list: Sequence[Document]
+    ) -> List[Tuple[List[str], List[Document]]]:
+        return [
+            (
+                list(id_list[i : i + self.batch_size]),
+                list(doc_list[i : i + self.batch_size]),
+            )
+            for i in range(0, len(doc_list), self.batch_size)
+        ]
+
+    def run(
+        self,
+        id_list: Sequence[str],
+        doc_list: Sequence[Document],
+        on_batch: BatchHandler,
+    ) -> EmbeddingProgress:
+        return run_sync(
+            self.run_async(id_list=id_list, doc_list=doc_list, on_batch=on_batch)
+        )
+
+    async def run_async(
+        self,
+        id_list: Sequence[str],
+        doc_list: Sequence[Document],
+        on_batch: BatchHandler,
+    ) -> EmbeddingProgress:
+        """Embeds doc_list and calls on_batch per batch, in completion order."""
+        if len(id_list) != len(doc_list):
+            raise ValueError(f"{len(id_list)} ids for {len(doc_list)} chunks")
+        queue: asyncio.Queue = asyncio.Queue()
+        for batch in self.get_batch_list(id_list=id_list, doc_list=doc_list):
+            queue.put_nowait(batch)
+        progress = EmbeddingProgress(
+            chunk_count=len(doc_list), batch_count=queue.qsize()
+        )
+
+        async def worker():
+            while not queue.empty():
+                batch_id_list, batch_doc_list = queue.get_nowait()
+                vector_list = await self.embed_batch(
+                    text_list=[doc.page_content for doc in batch_doc_list],
+                    progress=progress,
+                )
+                on_batch(batch_id_list, batch_doc_list, vector_list)
+                progress.batch_done_count += 1
+                progress.chunk_done_count += len(batch_doc_list)
+                progress.log()
+
+        worker_list = [
+            asyncio.create_task(worker())
+            for _ in range(min(self.concurrency, progress.batch_count))
+        ]
+        try:
+            await asyncio.gather(*worker_list)
+        except BaseException:
+            for task in worker_list:
+                task.cancel()
+            raise
+        return progress
+
+    async def embed_batch(
+        self, text_list: List[str], progress: EmbeddingProgress
+    ) -> List[List[float]]:
+        for retry in range(self.retry_count + 1):
+            try:
+                return await self.embeddings.aembed_documents(text_list)
+            except Exception as e:
+                if retry == self.retry_count:
+                    raise
+                backoff_s = min(self.backoff_s * 2**retry, self.backoff_max_s)
+                LOGGER.warning(
+                    f"embedding batch of {len(text_list)} failed: {e!r}, "
+                    f"retry {retry + 1}/{self.retry_count} in {backoff_s:.1f}s"
+                )
+                progress.retry_count += 1
+                await asyncio.sleep(backoff_s)
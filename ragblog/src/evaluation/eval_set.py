@@ -10,6 +10,7 @@ from ragas.llms import LangchainLLMWrapper
 from ragas.testset import TestsetGenerator
 
 from src.const import CONST
+from src.embedding_cache import get_embeddings_cached
 
 
 @dataclass
@@ -52,7 +53,12 @@ class EvalSet:
         )
 
         generator_embeddings = LangchainEmbeddingsWrapper(
-            OllamaEmbeddings(model=CONST.model.emb)
+            get_embeddings_cached(
+                embeddings=OllamaEmbeddings(
+                    model=CONST.model.emb, base_url=CONST.api.ollama_url
+                ),
+                model=CONST.model.emb,
+            )
         )
 
         generator = TestsetGenerator(
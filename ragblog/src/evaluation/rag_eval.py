@@ -1,11 +1,13 @@
 import asyncio
 from typing import Any, Dict, List
 
+from langchain_core.embeddings import Embeddings
+from langchain_ollama import OllamaEmbeddings
 from openai import AsyncOpenAI
 from pydantic import BaseModel
 from ragas.backends import InMemoryBackend
 from ragas.dataset import Dataset
-from ragas.embeddings.base import embedding_factory
+from ragas.embeddings.base import BaseRagasEmbedding
 from ragas.experiment import experiment
 from ragas.llms import llm_factory
 from ragas.metrics.collections import (
@@ -16,6 +18,7 @@ from ragas.metrics.collections import (
 )
 
 from src.const import CONST
+from src.embedding_cache import get_embeddings_cached
 from src.evaluation.eval_set import EvalSet
 from src.rag import Rag
 
@@ -33,6 +36,26 @@ class EvalResult(BaseModel):
     answer_relevancy: float = 0.0
 
 
+class EmbeddingRagas(BaseRagasEmbedding):
+    """Langchain embeddings behind the ragas embedding interface."""
+
+    def __init__(self, embeddings: Embeddings):
+        super().__init__()
+        self.embeddings = embeddings
+
+    def embed_text(self, text: str, **kwargs: Any) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_text(self, text: str, **kwargs: Any) -> List[float]:
+        return await self.embeddings.aembed_query(text)
+
+    def embed_texts(self, texts: List[str], **kwargs: Any) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_texts(self, texts: List[str], **kwargs: Any) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+
 class RagEval:
     """Evaluates a Rag instance against a EvalSet.
 
@@ -49,7 +72,15 @@ class RagEval:
             api_key=CONST.api.ollama_api_key,
         )
         llm = llm_factory(CONST.model.eval_aug, client=client)
-        emb = embedding_factory("openai", CONST.model.emb, client=client)
+        # the embedding model of the index, through the shared embedding cache
+        emb = EmbeddingRagas(
+            embeddings=get_embeddings_cached(
+                embeddings=OllamaEmbeddings(
+                    model=CONST.model.emb, base_url=CONST.api.ollama_url
+                ),
+                model=CONST.model.emb,
+            )
+        )
 
         self.metrics = {
             "context_precision": ContextPrecision(llm=llm),
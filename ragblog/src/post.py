@@ -22,7 +22,11 @@ class Post:
             print(f"Failed to load post {url}")
             return PostEmpty()
 
-        post_soup = BeautifulSoup(post_response.content, "html.parser")
+        return cls.from_content(content=post_response.content)
+
+    @classmethod
+    def from_content(cls, content: bytes) -> Post:
+        post_soup = BeautifulSoup(content, "html.parser")
 
         content_div = post_soup.find("div", class_="post-body")
         text = content_div.get_text(separator="\n").strip() if content_div else ""
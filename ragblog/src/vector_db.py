@@ -1,11 +1,17 @@
-import shutil
-from typing import List
+import hashlib
+from dataclasses import asdict
+from typing import Dict, List, Set
 
+import chromadb
+from chromadb.api import ClientAPI, Collection
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_ollama import OllamaEmbeddings
 
 from src.const import CONST
+from src.embedding_cache import get_embeddings_cached
+from src.embedding_pipeline import EmbeddingPipeline
 from src.logger_custom import LOGGER, log_init
 
 
@@ -17,24 +23,132 @@ class VectorDB:
         self.model = CONST.model.emb
         self.persist_directory = CONST.loc.vect_db
         self.collection_name = "collection_ragblog"
+        self.base_url = CONST.api.ollama_url
+        self.embedding_cache_path = CONST.loc.emb_cache
+        self.embed_conf = CONST.embed
 
-    def save(self, doc_list: List[Document]) -> None:
-        doc_list_count = len(doc_list)
-        LOGGER.info(f"{doc_list_count=}")
-        if self.persist_directory.exists():
-            shutil.rmtree(self.persist_directory)
-        Chroma.from_documents(
-            documents=doc_list,
-            embedding=OllamaEmbeddings(model=self.model),
-            persist_directory=self.persist_directory,
-            collection_name=self.collection_name,
+    def get_embeddings(self) -> Embeddings:
+        return get_embeddings_cached(
+            embeddings=OllamaEmbeddings(model=self.model, base_url=self.base_url),
+            model=self.model,
+            path=self.embedding_cache_path,
+        )
+
+    @staticmethod
+    def get_chunk_id(doc: Document) -> str:
+        """Stable chunk id: post title, chunk offset and content hash.
+
+        blog.jsonl has no url per post, the title stands for it.
+        """
+        content_hash = hashlib.sha256(doc.page_content.encode()).hexdigest()
+        key = "\0".join(
+            [
+                str(doc.metadata.get("title", doc.metadata.get("source", ""))),
+                str(doc.metadata.get("start_index", "")),
+                content_hash,
+            ]
+        )
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def save(self, doc_list: List[Document], is_rebuild: bool = False) -> None:
+        """Upserts doc_list by chunk id, then deletes the chunks not in it.
+
+        Only the new or changed chunks are embedded. is_rebuild embeds every
+        chunk into a new collection that replaces the current one once done.
+        The index is left as is when embedding fails.
+        """
+        doc_dict: Dict[str, Document] = {
+            self.get_chunk_id(doc=doc): doc for doc in doc_list
+        }
+        LOGGER.info(f"doc_list_count={len(doc_list)} chunk_count={len(doc_dict)}")
+        if is_rebuild:
+            self.rebuild(doc_dict=doc_dict)
+            return
+
+        collection = self.get_collection(name=self.collection_name)
+        id_stored_set = set(collection.get(include=[])["ids"])
+        id_stale_list = sorted(id_stored_set.difference(doc_dict))
+        id_new_list = [id_ for id_ in doc_dict if id_ not in id_stored_set]
+        LOGGER.info(
+            f"chunk new={len(id_new_list)} stale={len(id_stale_list)} "
+            f"unchanged={len(doc_dict) - len(id_new_list)}"
+        )
+        if id_new_list:
+            self.embed(
+                collection=collection,
+                id_list=id_new_list,
+                doc_list=[doc_dict[id_] for id_ in id_new_list],
+            )
+        if id_stale_list:
+            collection.delete(ids=id_stale_list)
+
+    def rebuild(self, doc_dict: Dict[str, Document]) -> None:
+        client = self.get_client()
+        name_rebuild = f"{self.collection_name}_rebuild"
+        # left by a failed rebuild
+        if name_rebuild in self.get_collection_name_set():
+            client.delete_collection(name=name_rebuild)
+        collection = self.get_collection(name=name_rebuild)
+        self.embed(
+            collection=collection,
+            id_list=list(doc_dict),
+            doc_list=list(doc_dict.values()),
+        )
+        if self.collection_name in self.get_collection_name_set():
+            client.delete_collection(name=self.collection_name)
+        collection.modify(name=self.collection_name)
+        LOGGER.info(f"rebuilt chunk_count={len(doc_dict)}")
+
+    def embed(
+        self, collection: Collection, id_list: List[str], doc_list: List[Document]
+    ) -> None:
+        """Embeds through EmbeddingPipeline, each batch upserted once embedded.
+
+        The vectors are upserted with the chromadb collection, Chroma only
+        adds texts it embeds itself.
+        """
+
+        def on_batch(
+            batch_id_list: List[str],
+            batch_doc_list: List[Document],
+            vector_list: List[List[float]],
+        ) -> None:
+            collection.upsert(
+                ids=batch_id_list,
+                embeddings=vector_list,
+                documents=[doc.page_content for doc in batch_doc_list],
+                metadatas=[doc.metadata or None for doc in batch_doc_list],
+            )
+
+        progress = EmbeddingPipeline(
+            embeddings=self.get_embeddings(), **asdict(self.embed_conf)
+        ).run(id_list=id_list, doc_list=doc_list, on_batch=on_batch)
+        LOGGER.info(
+            f"embedded chunk_count={progress.chunk_done_count} "
+            f"in {progress.elapsed_s:.1f}s, {progress.chunk_per_s:.1f} chunk/s, "
+            f"retry_count={progress.retry_count}"
+        )
+
+    def get_client(self) -> ClientAPI:
+        return chromadb.PersistentClient(path=self.persist_directory)
+
+    def get_collection_name_set(self) -> Set[str]:
+        return {
+            getattr(collection, "name", collection)
+            for collection in self.get_client().list_collections()
+        }
+
+    def get_collection(self, name: str) -> Collection:
+        """The collection as Chroma creates it, the vectors come with the chunks."""
+        return self.get_client().get_or_create_collection(
+            name=name, embedding_function=None
         )
 
     def load(self) -> Chroma:
         return Chroma(
-            persist_directory=self.persist_directory,
+            client=self.get_client(),
             collection_name=self.collection_name,
-            embedding_function=OllamaEmbeddings(model=self.model),
+            embedding_function=self.get_embeddings(),
         )
 
     def get_vector_db(self, doc_list: List[Document] | None) -> Chroma:
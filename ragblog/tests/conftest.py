@@ -0,0 +1,44 @@
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List, Type
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    """Fake embedding recording the texts it embeds, in text_list."""
+
+    text_list: List[str] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.text_list.extend(texts)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        self.text_list.append(text)
+        return super().embed_query(text)
+
+
+@pytest.fixture
+def embedding():
+    return CountingEmbedding(size=8)
+
+
+@contextmanager
+def local_http_server(handler_class: Type[BaseHTTPRequestHandler]) -> Iterator[str]:
+    """handler_class served on a free local port, yields its base url."""
+
+    class Handler(handler_class):
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -1,4 +1,15 @@
-from src.crawler import Crawler
+import asyncio
+import hashlib
+import time
+from http.server import BaseHTTPRequestHandler
+from unittest.mock import patch
+
+import pytest
+
+from src.crawl_cache import CrawlCache
+from src.crawler import Crawler, RateLimiter
+from src.post import Post
+from tests.conftest import local_http_server
 
 CRAWLER = Crawler(post_count_min=2)
 
@@ -29,3 +40,144 @@ def test_get_post_list_bellow_fold():
     crawler = Crawler(post_count_min=10)
     crawler.get_url_list()
     assert len(crawler.url_list) >= 10
+
+
+def get_page_listing(base_url: str, post_path_list, older_path=None) -> str:
+    titles = "".join(
+        f'<h3 class="post-title"><a href="{base_url}{path}">t</a></h3>'
+        for path in post_path_list
+    )
+    older = (
+        f'<a class="blog-pager-older-link flat-button ripple" '
+        f'href="{base_url}{older_path}">older</a>'
+        if older_path
+        else ""
+    )
+    return f"<html><body>{titles}{older}</body></html>"
+
+
+def get_page_post(title: str, text: str) -> str:
+    return (
+        f'<html><body><h3 class="entry-title">{title}</h3>'
+        f'<div class="post-body"><p>{text}</p></div></body></html>'
+    )
+
+
+@pytest.fixture
+def blog_server():
+    """Local stand-in of the blog, serving fixture html by path."""
+    page_dict = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            page = page_dict.get(self.path)
+            if page is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            etag = f'"{hashlib.md5(page.encode()).hexdigest()}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(page.encode())
+
+    with local_http_server(handler_class=Handler) as base_url:
+        page_dict.update(
+            {
+                "/": get_page_listing(
+                    base_url=base_url,
+                    post_path_list=["/2024/b.html", "/2024/a.html"],
+                    older_path="/page/2",
+                ),
+                "/page/2": get_page_listing(
+                    base_url=base_url,
+                    post_path_list=[
+                        "/2023/c.html",
+                        "/2023/missing.html",
+                        "/2023/d.html",
+                    ],
+                ),
+                "/2024/a.html": get_page_post(title="Post a", text="text a"),
+                "/2024/b.html": get_page_post(title="Post b", text="text b"),
+                "/2023/c.html": get_page_post(title="Post c", text="text c"),
+                "/2023/d.html": get_page_post(title="Post d", text=""),
+            }
+        )
+        yield base_url + "/", page_dict
+
+
+def test_crawl_local(blog_server, tmp_path):
+    url, _ = blog_server
+    crawler = Crawler(post_count_min=3, url=url, concurrency=2, crawl_cache_path=None)
+
+    crawler.get_url_list()
+    crawler.get_post_list()
+    crawler.write(path=tmp_path)
+
+    assert len(crawler.url_list) == 5
+    assert [post.title for post in crawler.post_list] == ["Post c", "Post a", "Post b"]
+
+    post_list = [Post.from_url(url=url) for url in crawler.url_list]
+    content = "\n".join(str(post) for post in post_list if post.title)
+    assert (tmp_path / "blog.jsonl").read_text() == content
+
+
+def test_crawl_cache(blog_server, tmp_path):
+    url, page_dict = blog_server
+    crawl_cache_path = tmp_path / "crawl_cache.json"
+
+    crawler = Crawler(post_count_min=3, url=url, crawl_cache_path=crawl_cache_path)
+    crawler.get_url_list()
+    crawler.get_post_list()
+    crawler.crawl_cache.save()
+    assert len(crawler.post_changed_list) == 3
+
+    page_dict["/2024/b.html"] = get_page_post(title="Post b", text="text b edit")
+    page_dict["/2024/e.html"] = page_dict["/2024/a.html"].replace("Post a", "Post e")
+    crawler = Crawler(post_count_min=3, url=url, crawl_cache_path=crawl_cache_path)
+    crawler.url_list = [f"{url}2024/a.html", f"{url}2024/b.html", f"{url}2024/e.html"]
+    crawler.get_post_list()
+
+    assert [post.title for post in crawler.post_list] == ["Post a", "Post b", "Post e"]
+    assert [post.text for post in crawler.post_changed_list] == [
+        "text b edit",
+        "text a",
+    ]
+    # post c is no longer listed
+    crawler.crawl_cache.save()
+    assert sorted(CrawlCache(path=crawl_cache_path).entry_dict) == crawler.url_list
+
+
+def test_crawl_in_running_loop(blog_server, tmp_path):
+    url, _ = blog_server
+    crawler = Crawler(post_count_min=3, url=url, crawl_cache_path=None)
+
+    async def run():
+        # as from a Jupyter cell
+        with patch.object(Crawler, "write") as mock_write:
+            crawler.run()
+        mock_write.assert_called_once()
+        crawler.get_url_list()
+
+    asyncio.run(run())
+
+    assert len(crawler.url_list) == 5
+    assert [post.title for post in crawler.post_list] == ["Post c", "Post a", "Post b"]
+
+
+def test_rate_limiter():
+    rate_limiter = RateLimiter(rate_per_host=20)
+
+    async def run():
+        time_start = time.perf_counter()
+        await asyncio.gather(
+            *(rate_limiter.wait(url=f"http://a/{i}") for i in range(5)),
+            rate_limiter.wait(url="http://b/0"),
+        )
+        return time.perf_counter() - time_start
+
+    assert 0.2 <= asyncio.run(run()) < 0.5
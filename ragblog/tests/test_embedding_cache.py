@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from src.embedding_cache import (
+    EmbeddingCache,
+    EmbeddingsCached,
+    get_embedding_cache,
+    get_embeddings_cached,
+)
+from src.evaluation.rag_eval import EmbeddingRagas
+
+
+def get_embeddings_cached_at(embedding, path, model="model_a") -> EmbeddingsCached:
+    return EmbeddingsCached(
+        embeddings=embedding, model=model, cache=EmbeddingCache(path=path)
+    )
+
+
+def test_embed_documents(embedding, tmp_path):
+    path = tmp_path / "emb_cache.sqlite"
+    embeddings = get_embeddings_cached_at(embedding=embedding, path=path)
+
+    vector_list = embeddings.embed_documents(["a", "b", "a"])
+    assert embedding.text_list == ["a", "b"]
+    assert vector_list[0] == vector_list[2]
+    assert vector_list[1] == pytest.approx(embedding.embed_query("b"), abs=1e-6)
+    embedding.text_list.clear()
+
+    assert embeddings.embed_documents(["b", "c"])[0] == vector_list[1]
+    assert embedding.text_list == ["c"]
+    assert (embeddings.cache.hit_count, embeddings.cache.miss_count) == (2, 3)
+
+
+def test_persist_and_model(embedding, tmp_path):
+    path = tmp_path / "emb_cache.sqlite"
+    vector = get_embeddings_cached_at(embedding=embedding, path=path).embed_query("a")
+    embedding.text_list.clear()
+
+    # another process or run on the same file
+    embeddings = get_embeddings_cached_at(embedding=embedding, path=path)
+    assert embeddings.embed_query("a") == vector
+    assert embeddings.embed_documents(["a"]) == [vector]
+    assert embedding.text_list == []
+
+    get_embeddings_cached_at(
+        embedding=embedding, path=path, model="model_b"
+    ).embed_query("a")
+    assert embedding.text_list == ["a"]
+
+
+def test_aembed(embedding, tmp_path):
+    embeddings = get_embeddings_cached_at(
+        embedding=embedding, path=tmp_path / "emb_cache.sqlite"
+    )
+
+    async def run():
+        return (
+            await embeddings.aembed_documents(["a", "b"]),
+            await embeddings.aembed_query("b"),
+        )
+
+    vector_list, vector = asyncio.run(run())
+    assert vector == vector_list[1]
+    assert embedding.text_list == ["a", "b"]
+
+
+def test_get_embeddings_cached(embedding, tmp_path):
+    path = tmp_path / "emb_cache.sqlite"
+
+    assert get_embeddings_cached(embeddings=embedding, model="m", path=None) is (
+        embedding
+    )
+
+    embeddings = get_embeddings_cached(embeddings=embedding, model="m", path=path)
+    embeddings_other = get_embeddings_cached(embeddings=embedding, model="m", path=path)
+    # one cache per path, its hit counts add up across callers
+    assert embeddings.cache is embeddings_other.cache is get_embedding_cache(path)
+    assert get_embedding_cache(tmp_path / "other.sqlite") is not embeddings.cache
+    embeddings.embed_query("a")
+    embeddings_other.embed_query("a")
+    assert (embeddings.cache.hit_count, embeddings.cache.miss_count) == (1, 1)
+    assert embedding.text_list == ["a"]
+
+
+def test_embedding_ragas(embedding, tmp_path):
+    embeddings = get_embeddings_cached_at(
+        embedding=embedding, path=tmp_path / "emb_cache.sqlite"
+    )
+    embedding_ragas = EmbeddingRagas(embeddings=embeddings)
+
+    vector_list = embedding_ragas.embed_texts(["a", "b"])
+    assert embedding_ragas.embed_text("b") == vector_list[1]
+
+    async def run():
+        return (
+            await embedding_ragas.aembed_texts(["a", "c"]),
+            await embedding_ragas.aembed_text("c"),
+        )
+
+    vector_list_async, vector = asyncio.run(run())
+    assert vector_list_async[0] == vector_list[0]
+    assert vector == vector_list_async[1]
+    assert embedding.text_list == ["a", "b", "c"]
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from typing import List
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.const import Embed
+from src.embedding_pipeline import EmbeddingPipeline
+from src.vector_db import VectorDB
+from tests.conftest import local_http_server
+
+
+@pytest.fixture
+def embedding_server():
+    """Local stand-in of the Ollama /api/embed endpoint.
+
+    Fails the first fail_count requests with a 500, records each batch and the
+    most requests in flight at once.
+    """
+    state = {"fail_count": 0, "batch_list": [], "in_flight": 0, "in_flight_max": 0}
+    lock = threading.Lock()
+    embedding = DeterministicFakeEmbedding(size=8)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with lock:
+                state["in_flight"] += 1
+                state["in_flight_max"] = max(state["in_flight_max"], state["in_flight"])
+                is_fail = state["fail_count"] > 0
+                state["fail_count"] -= is_fail
+            time.sleep(0.05)
+            with lock:
+                state["in_flight"] -= 1
+            if is_fail:
+                self.send_response(500)
+                self.end_headers()
+                self.wfile.write(b'{"error": "overloaded"}')
+                return
+            with lock:
+                state["batch_list"].append(body["input"])
+            content = json.dumps(
+                {
+                    "model": body["model"],
+                    "embeddings": embedding.embed_documents(body["input"]),
+                }
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+    with local_http_server(handler_class=Handler) as base_url:
+        yield base_url, state
+
+
+def get_doc_list(count: int) -> List[Document]:
+    return [
+        Document(page_content=f"text {i}", metadata={"title": f"post {i}"})
+        for i in range(count)
+    ]
+
+
+def test_save_through_server(embedding_server, tmp_path):
+    base_url, state = embedding_server
+    state["fail_count"] = 1
+    vector_db = VectorDB()
+    vector_db.persist_directory = str(tmp_path / "vect_db")
+    vector_db.base_url = base_url
+    vector_db.embedding_cache_path = None
+    vector_db.embed_conf = Embed(batch_size=3, concurrency=2, backoff_s=0.01)
+
+    doc_list = get_doc_list(count=10)
+    vector_db.save(doc_list=doc_list)
+
+    assert sorted(len(batch) for batch in state["batch_list"]) == [1, 3, 3, 3]
+    assert sorted(text for batch in state["batch_list"] for text in batch) == sorted(
+        doc.page_content for doc in doc_list
+    )
+    assert state["in_flight_max"] == 2
+
+    stored = vector_db.load().get(include=["documents", "metadatas", "embeddings"])
+    assert len(stored["ids"]) == 10
+    document_dict = dict(zip(stored["documents"], stored["metadatas"]))
+    assert document_dict["text 4"] == {"title": "post 4"}
+    # retrieval embeds the query through the same server
+    assert vector_db.load().similarity_search("text 7", k=1)[0].page_content == "text 7"
+
+
+def test_save_through_server_cached(embedding_server, tmp_path):
+    base_url, state = embedding_server
+    vector_db = VectorDB()
+    vector_db.persist_directory = str(tmp_path / "vect_db")
+    vector_db.base_url = base_url
+    vector_db.embedding_cache_path = tmp_path / "emb_cache.sqlite"
+    vector_db.embed_conf = Embed(batch_size=4, concurrency=2)
+    doc_list = get_doc_list(count=10)
+
+    vector_db.save(doc_list=doc_list)
+    assert sum(len(batch) for batch in state["batch_list"]) == 10
+    stored = vector_db.load().get(include=["embeddings"])
+
+    # the rebuild embeds every chunk again, all from the cache
+    state["batch_list"].clear()
+    vector_db.save(doc_list=doc_list, is_rebuild=True)
+    assert state["batch_list"] == []
+
+    stored_rebuild = vector_db.load().get(include=["embeddings"])
+    assert sorted(stored_rebuild["ids"]) == sorted(stored["ids"])
+    vector_dict = dict(zip(stored["ids"], stored["embeddings"].tolist()))
+    for id_, vector in zip(stored_rebuild["ids"], stored_rebuild["embeddings"]):
+        assert vector.tolist() == vector_dict[id_]
+
+
+def test_retry_exhausted(embedding_server):
+    base_url, state = embedding_server
+    state["fail_count"] = 3
+    vector_db = VectorDB()
+    vector_db.base_url = base_url
+    vector_db.embedding_cache_path = None
+    pipeline = EmbeddingPipeline(
+        embeddings=vector_db.get_embeddings(), retry_count=2, backoff_s=0.01
+    )
+    batch_done_list = []
+
+    with pytest.raises(Exception, match="overloaded"):
+        pipeline.run(
+            id_list=["a"],
+            doc_list=get_doc_list(count=1),
+            on_batch=lambda *batch: batch_done_list.append(batch),
+        )
+    assert batch_done_list == []
+    assert state["fail_count"] == 0
+
+
+def test_progress():
+    pipeline = EmbeddingPipeline(
+        embeddings=DeterministicFakeEmbedding(size=4), batch_size=4, concurrency=3
+    )
+    doc_list = get_doc_list(count=9)
+    batch_done_list = []
+
+    progress = pipeline.run(
+        id_list=[str(i) for i in range(9)],
+        doc_list=doc_list,
+        on_batch=lambda *batch: batch_done_list.append(batch),
+    )
+
+    assert (progress.batch_count, progress.batch_done_count) == (3, 3)
+    assert (progress.chunk_count, progress.chunk_done_count) == (9, 9)
+    assert progress.retry_count == 0
+    assert progress.chunk_per_s > 0
+    id_list = sorted(id_ for id_list, _, _ in batch_done_list for id_ in id_list)
+    assert id_list == sorted(str(i) for i in range(9))
+    for batch_id_list, batch_doc_list, vector_list in batch_done_list:
+        assert len(batch_id_list) == len(batch_doc_list) == len(vector_list)
+
+
+def test_run_in_running_loop():
+    pipeline = EmbeddingPipeline(
+        embeddings=DeterministicFakeEmbedding(size=4), batch_size=2
+    )
+
+    async def run():
+        return pipeline.run(
+            id_list=["a", "b", "c"],
+            doc_list=get_doc_list(count=3),
+            on_batch=lambda *batch: None,
+        )
+
+    progress = asyncio.run(run())
+
+    assert (progress.batch_done_count, progress.chunk_done_count) == (2, 3)
@@ -3,12 +3,15 @@ from unittest.mock import MagicMock, patch
 import pytest
 from langchain_core.documents import Document
 
+from src.const import Embed
 from src.vector_db import VectorDB
 
 
 @pytest.fixture
 def vector_db():
-    return VectorDB()
+    vector_db = VectorDB()
+    vector_db.embedding_cache_path = None
+    return vector_db
 
 
 def test_init(vector_db):
@@ -16,27 +19,79 @@ def test_init(vector_db):
     assert vector_db.collection_name == "collection_ragblog"
 
 
-@patch("src.vector_db.Chroma")
-@patch("src.vector_db.OllamaEmbeddings")
-def test_save(mock_ollama, mock_chroma, vector_db):
-    mock_embedding_instance = MagicMock()
-    mock_ollama.return_value = mock_embedding_instance
-    mock_chroma.from_documents = MagicMock()
+def test_get_chunk_id():
+    doc = Document(page_content="text", metadata={"title": "a", "start_index": 0})
 
-    docs = [Document(page_content="test")]
-    vector_db.save(docs)
-
-    mock_chroma.from_documents.assert_called_once_with(
-        documents=docs,
-        embedding=mock_embedding_instance,
-        persist_directory=vector_db.persist_directory,
-        collection_name=vector_db.collection_name,
+    assert VectorDB.get_chunk_id(doc=doc) == VectorDB.get_chunk_id(
+        doc=Document(page_content="text", metadata={"title": "a", "start_index": 0})
     )
+    for doc_other in [
+        Document(page_content="text!", metadata={"title": "a", "start_index": 0}),
+        Document(page_content="text", metadata={"title": "b", "start_index": 0}),
+        Document(page_content="text", metadata={"title": "a", "start_index": 7}),
+    ]:
+        assert VectorDB.get_chunk_id(doc=doc) != VectorDB.get_chunk_id(doc=doc_other)
+
+
+def test_save_incremental(vector_db, embedding, tmp_path):
+    vector_db.persist_directory = str(tmp_path / "vect_db")
+
+    def get_doc(title: str, text: str) -> Document:
+        return Document(page_content=text, metadata={"title": title, "start_index": 0})
+
+    with patch("src.vector_db.OllamaEmbeddings", return_value=embedding):
+        vector_db.save([get_doc("a", "one"), get_doc("b", "two"), get_doc("c", "3")])
+        assert sorted(embedding.text_list) == ["3", "one", "two"]
+
+        embedding.text_list.clear()
+        vector_db.save(
+            [get_doc("a", "one"), get_doc("b", "two changed"), get_doc("d", "four")]
+        )
+        assert sorted(embedding.text_list) == ["four", "two changed"]
+
+        embedding.text_list.clear()
+        vector_db.save([get_doc("a", "one"), get_doc("b", "two changed")])
+        assert embedding.text_list == []
+
+        stored = vector_db.load().get()
+        assert sorted(stored["documents"]) == ["one", "two changed"]
+        assert len(stored["ids"]) == 2
+
+        vector_db.save(
+            [get_doc("a", "one"), get_doc("b", "two changed")], is_rebuild=True
+        )
+        assert sorted(embedding.text_list) == ["one", "two changed"]
+        assert sorted(vector_db.load().get()["ids"]) == sorted(stored["ids"])
+
+
+def test_save_embedding_failed(vector_db, embedding, tmp_path):
+    vector_db.persist_directory = str(tmp_path / "vect_db")
+    vector_db.embed_conf = Embed(retry_count=0)
+    doc_list = [
+        Document(page_content=text, metadata={"title": title, "start_index": 0})
+        for title, text in [("a", "one"), ("b", "two")]
+    ]
+    with patch("src.vector_db.OllamaEmbeddings", return_value=embedding):
+        vector_db.save(doc_list)
+        stored = vector_db.load().get()
+
+        doc_list[1].page_content = "two changed"
+        with patch.object(
+            type(embedding), "aembed_documents", side_effect=RuntimeError("down")
+        ):
+            for is_rebuild in [False, True]:
+                with pytest.raises(RuntimeError, match="down"):
+                    vector_db.save(doc_list, is_rebuild=is_rebuild)
+                assert vector_db.load().get() == stored
+
+        vector_db.save(doc_list, is_rebuild=True)
+        assert sorted(vector_db.load().get()["documents"]) == ["one", "two changed"]
 
 
 @patch("src.vector_db.Chroma")
+@patch("src.vector_db.chromadb.PersistentClient")
 @patch("src.vector_db.OllamaEmbeddings")
-def test_load(mock_ollama, mock_chroma, vector_db):
+def test_load(mock_ollama, mock_client, mock_chroma, vector_db):
     mock_embedding_instance = MagicMock()
     mock_ollama.return_value = mock_embedding_instance
     mock_chroma_instance = MagicMock()
@@ -44,8 +99,9 @@ def test_load(mock_ollama, mock_chroma, vector_db):
 
     result = vector_db.load()
 
+    mock_client.assert_called_with(path=vector_db.persist_directory)
     mock_chroma.assert_called_with(
-        persist_directory=vector_db.persist_directory,
+        client=mock_client.return_value,
         collection_name=vector_db.collection_name,
         embedding_function=mock_embedding_instance,
     )
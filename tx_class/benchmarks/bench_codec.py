@@ -0,0 +1,64 @@
+import argparse
+import json
+import random
+import time
+
+from benchmarks.bench_service import get_payload
+from src.app.codec import Codec
+from src.app.logger_custom import LoggerCustom
+from src.app.schema_pydantic import Response
+
+
+def get_duration_us(fn, repeat: int) -> float:
+    time_start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - time_start) / repeat * 1e6
+
+
+def get_duration_dict(codec: Codec, batch_size: int, repeat: int) -> dict:
+    """parse and serialize cost of one request, per transaction when batched."""
+    payload = get_payload(
+        rng=random.Random(42), payload_mix="mixed", batch_size=batch_size
+    )
+    body = json.dumps(payload).encode()
+    response_list = [
+        Response(id="some_generated_id", id_request=f"id_{i}", is_fraud_prob=0.1)
+        for i in range(batch_size)
+    ]
+
+    if batch_size > 1:
+        parse = lambda: codec.parse_request_list(body=body)
+        render = lambda: codec.render(
+            content=[response.dict() for response in response_list]
+        )
+    else:
+        parse = lambda: codec.parse_request(body=body)
+        render = lambda: codec.render(content=response_list[0].dict())
+    return {
+        "parse_us": get_duration_us(fn=parse, repeat=repeat) / batch_size,
+        "serialize_us": get_duration_us(fn=render, repeat=repeat) / batch_size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[1, 32])
+    parser.add_argument("--repeat", type=int, default=2_000)
+    args = parser.parse_args()
+
+    logger = LoggerCustom().logger
+    for batch_size in args.batch_size:
+        for name, codec in [("default", Codec()), ("orjson", Codec(is_fast=True))]:
+            duration_dict = get_duration_dict(
+                codec=codec, batch_size=batch_size, repeat=args.repeat
+            )
+            logger.info(
+                f"codec: {name} batch_size: {batch_size} "
+                f"parse: {duration_dict['parse_us']:.1f}us "
+                f"serialize: {duration_dict['serialize_us']:.1f}us"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import httpx
+import numpy as np
+
+from src.app.logger_custom import LoggerCustom
+
+PAYLOAD_MIX_LIST = ["minimal", "full", "mixed"]
+
+
+def get_transaction(rng: random.Random, payload_mix: str) -> Dict:
+    transaction = {"id": f"{rng.getrandbits(64):016x}"}
+    if payload_mix == "minimal" or (payload_mix == "mixed" and rng.random() < 0.5):
+        return transaction
+    return {
+        **transaction,
+        "dtime": f"2024-01-{rng.randint(1, 31):02d} {rng.randint(0, 23):02d}:00:00",
+        "amount": round(rng.uniform(10.0, 2000.0), 2),
+        "transaction_type": rng.choice(["credit", "debit"]),
+        "code": rng.choice(["ab1", "ab2", "ac1", "ba1"]),
+    }
+
+
+def get_payload(rng: random.Random, payload_mix: str, batch_size: int):
+    request_list = [
+        {"id": transaction["id"], "transaction": transaction}
+        for transaction in (
+            get_transaction(rng=rng, payload_mix=payload_mix) for _ in range(batch_size)
+        )
+    ]
+    return request_list if batch_size > 1 else request_list[0]
+
+
+async def run_case(
+    client: httpx.AsyncClient,
+    concurrency: int,
+    request_count: int,
+    payload_mix: str,
+    batch_size: int,
+) -> Dict:
+    """request_count posts from concurrency workers, to /predict_batch if batched."""
+    rng = random.Random(42)
+    payload_list = [
+        get_payload(rng=rng, payload_mix=payload_mix, batch_size=batch_size)
+        for _ in range(request_count)
+    ]
+    url = "/predict_batch" if batch_size > 1 else "/predict"
+    latency_list: List[float] = []
+    error_count = 0
+
+    async def worker(worker_index: int):
+        nonlocal error_count
+        for payload in payload_list[worker_index::concurrency]:
+            time_start = time.perf_counter()
+            response = await client.post(url, json=payload)
+            latency_list.append(time.perf_counter() - time_start)
+            error_count += response.status_code != 200
+
+    time_start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    duration_s = time.perf_counter() - time_start
+
+    latency_ms = np.array(latency_list) * 1000
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "payload_mix": payload_mix,
+        "batch_size": batch_size,
+        "request_count": request_count,
+        "error_count": error_count,
+        "requests_per_s": request_count / duration_s,
+        "transactions_per_s": request_count * batch_size / duration_s,
+        "latency_ms_p50": float(np.percentile(latency_ms, 50)),
+        "latency_ms_p95": float(np.percentile(latency_ms, 95)),
+        "latency_ms_p99": float(np.percentile(latency_ms, 99)),
+    }
+
+
+def get_client(url: str) -> httpx.AsyncClient:
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=60)
+
+    from src.app.service import app
+
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://asgi", timeout=60
+    )
+
+
+def get_commit() -> str:
+    try:
+        return (
+            subprocess.check_output(["git", "rev-parse", "--short", "HEAD"])
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(args, logger) -> Dict:
+    case_list = []
+    async with get_client(url=args.url) as client:
+        for concurrency in args.concurrency:
+            for payload_mix in args.payload_mix:
+                for batch_size in args.batch_size:
+                    case = await run_case(
+                        client=client,
+                        concurrency=concurrency,
+                        request_count=args.request_count,
+                        payload_mix=payload_mix,
+                        batch_size=batch_size,
+                    )
+                    logger.info(f"case: {case}")
+                    case_list.append(case)
+    return {
+        "commit": get_commit(),
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "target": "http" if args.url else "asgi",
+        "url": args.url,
+        "case_list": case_list,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="latency and throughput of /predict, in process through "
+        "the asgi app by default or against a served url, e.g. ray serve"
+    )
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument(
+        "--payload-mix", nargs="+", choices=PAYLOAD_MIX_LIST, default=["mixed"]
+    )
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[1, 32])
+    parser.add_argument("--request-count", type=int, default=500)
+    parser.add_argument("--output-dir", default="benchmarks/result")
+    args = parser.parse_args()
+
+    logger = LoggerCustom().logger
+    result = asyncio.run(run(args=args, logger=logger))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(
+        args.output_dir, f"bench_service_{result['commit']}_{result['target']}.json"
+    )
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    logger.info(f"result: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from typing import Dict, Optional
+
+import psutil
+
+from src.app.logger_custom import LoggerCustom
+from src.app.model import ModelClassificationCatBoost
+from src.app.model_compiled import ModelCompiled
+from src.app.train.data import get_df_random
+
+MB = 1024 * 1024
+
+
+def build_artifact(path: str, count: int):
+    model = ModelClassificationCatBoost()
+    model.train_and_evaluate(
+        df_train=get_df_random(count=count, seed=0),
+        df_test=get_df_random(count=count // 4, seed=1),
+    )
+    ModelCompiled.from_model(model=model).save(path=path)
+
+
+def run_replica(path: str, mmap_mode: Optional[str], barrier, queue):
+    """One replica: load, score once, report once all replicas are up."""
+    process = psutil.Process()
+    rss_start = process.memory_info().rss
+    time_start = time.perf_counter()
+    model = ModelCompiled.load(path=path, mmap_mode=mmap_mode)
+    model.predict_proba_batch(df=get_df_random(count=1, seed=2))
+    load_s = time.perf_counter() - time_start
+
+    barrier.wait()
+    memory_info = process.memory_full_info()
+    queue.put(
+        {
+            "load_s": load_s,
+            "rss_mb": memory_info.rss / MB,
+            "rss_load_mb": (memory_info.rss - rss_start) / MB,
+            "pss_mb": memory_info.pss / MB,
+            "uss_mb": memory_info.uss / MB,
+        }
+    )
+    barrier.wait()
+
+
+def run_case(path: str, mmap_mode: Optional[str], replica_count: int) -> Dict:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(replica_count)
+    queue = context.Queue()
+    process_list = [
+        context.Process(target=run_replica, args=(path, mmap_mode, barrier, queue))
+        for _ in range(replica_count)
+    ]
+    for process in process_list:
+        process.start()
+    result_list = [queue.get() for _ in process_list]
+    for process in process_list:
+        process.join()
+
+    return {
+        "mmap_mode": mmap_mode,
+        "replica_count": replica_count,
+        **{
+            f"{name}_mean": sum(r[name] for r in result_list) / replica_count
+            for name in result_list[0]
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="startup time and memory per replica of a compiled model, "
+        "loaded in memory or memory mapped"
+    )
+    parser.add_argument("--path", default=None, help="compiled model artifact")
+    parser.add_argument("--count", type=int, default=10_000)
+    parser.add_argument("--replica-count", type=int, default=4)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    logger = LoggerCustom().logger
+    with tempfile.TemporaryDirectory(prefix="tx_class_bench_") as dir_name:
+        path = args.path
+        if path is None:
+            path = os.path.join(dir_name, "model_compiled.joblib")
+            build_artifact(path=path, count=args.count)
+        logger.info(f"artifact: {path} {os.path.getsize(path) / MB:.1f}MB")
+
+        case_list = []
+        for mmap_mode in [None, "r"]:
+            case = run_case(
+                path=path, mmap_mode=mmap_mode, replica_count=args.replica_count
+            )
+            logger.info(f"case: {case}")
+            case_list.append(case)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(case_list, f, indent=2)
+        logger.info(f"result: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import CountVectorizer
+
+from src.app.logger_custom import LoggerCustom
+from src.app.model import TokenCountTransformer, TokenizerTransformer
+
+
+def get_df_random(count: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed=42)
+    return pd.DataFrame(
+        {
+            "code_0": rng.choice(["a", "b"], size=count),
+            "code_1": rng.choice(["a", "b", "c"], size=count),
+            "code_2": rng.choice(["1", "2"], size=count),
+            "transaction_type": rng.choice(["credit", "debit"], size=count),
+        }
+    )
+
+
+def transform_row_wise(X: pd.DataFrame) -> np.ndarray:
+    """TokenizerTransformer.transform before vectorization, the reference."""
+    return X.apply(
+        lambda row: " ".join([f"{col}|{val}" for col, val in row.items()]),
+        axis=1,
+    ).values
+
+
+def get_duration_s(fn) -> float:
+    time_start = time.perf_counter()
+    fn()
+    return time.perf_counter() - time_start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    logger = LoggerCustom().logger
+    df = get_df_random(count=args.count)
+    cat_cols = list(df.columns)
+    tokenizer = TokenizerTransformer(cat_cols=cat_cols, col_token="token_str")
+
+    duration_dict = {
+        "tokenizer_row_wise": get_duration_s(lambda: transform_row_wise(X=df)),
+        "tokenizer_vectorized": get_duration_s(lambda: tokenizer.transform(X=df)),
+        "tokenizer_count_vectorizer": get_duration_s(
+            lambda: CountVectorizer(min_df=0.001).fit_transform(
+                tokenizer.transform(X=df)
+            )
+        ),
+        "token_count_direct": get_duration_s(
+            lambda: TokenCountTransformer(cat_cols=cat_cols).fit_transform(X=df)
+        ),
+    }
+    for name, duration_s in duration_dict.items():
+        logger.info(f"count: {args.count} {name}: {duration_s:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import json
+from typing import Any, Dict, List, Optional, Type
+
+import orjson
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel, ValidationError, parse_obj_as
+
+from src.app.schema_pydantic import Request
+
+
+class ValidatorFast:
+    """Validation of a flat pydantic model through construct().
+
+    The field types are read once from the model. A value that already has its
+    type, or an int for a float field, skips pydantic validation; anything else
+    returns None so the caller falls back to the full validation.
+    """
+
+    TYPE_DICT = {str: (str,), float: (float, int), int: (int,)}
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.field_dict: Dict[str, Any] = {}
+        self.required_list: List[str] = []
+        self.default_dict: Dict[str, Any] = {}
+        for name, field in model.__fields__.items():
+            if field.alias != name or field.allow_none:
+                raise ValueError(f"field not supported: {model.__name__}.{name}")
+            if isinstance(field.outer_type_, type) and issubclass(
+                field.outer_type_, BaseModel
+            ):
+                self.field_dict[name] = ValidatorFast(model=field.outer_type_)
+            elif field.outer_type_ in self.TYPE_DICT:
+                self.field_dict[name] = field.outer_type_
+            else:
+                raise ValueError(f"field not supported: {model.__name__}.{name}")
+            if field.required:
+                self.required_list.append(name)
+            else:
+                self.default_dict[name] = field.default
+
+    def validate(self, obj: Any) -> Optional[BaseModel]:
+        if type(obj) is not dict:
+            return None
+        for name in self.required_list:
+            if name not in obj:
+                return None
+
+        value_dict = {}
+        for name, val in obj.items():
+            field_type = self.field_dict.get(name)
+            if field_type is None:
+                continue
+            if isinstance(field_type, ValidatorFast):
+                val = field_type.validate(obj=val)
+                if val is None:
+                    return None
+            elif type(val) not in self.TYPE_DICT[field_type]:
+                return None
+            elif field_type is float:
+                val = float(val)
+            value_dict[name] = val
+
+        fields_set = set(value_dict)
+        for name, default in self.default_dict.items():
+            if name not in value_dict:
+                value_dict[name] = default
+        # construct() without its per field default lookup
+        model = self.model.__new__(self.model)
+        object.__setattr__(model, "__dict__", value_dict)
+        object.__setattr__(model, "__fields_set__", fields_set)
+        return model
+
+
+def get_request_validation_error(e: ValidationError) -> RequestValidationError:
+    """pydantic errors located in the body as FastAPI reports them."""
+    return RequestValidationError(
+        [
+            {**error, "loc": ("body", *(l for l in error["loc"] if l != "__root__"))}
+            for error in e.errors()
+        ]
+    )
+
+
+class Codec:
+    """Parses the api payloads and renders its responses.
+
+    The default codec follows FastAPI: json and full pydantic validation. The
+    orjson codec decodes with orjson, validates through ValidatorFast and
+    renders with ORJSONResponse.
+    """
+
+    def __init__(self, is_fast: bool = False):
+        self.is_fast = is_fast
+        self.validator_request = ValidatorFast(model=Request)
+
+    def loads(self, body: bytes) -> Any:
+        try:
+            return orjson.loads(body) if self.is_fast else json.loads(body)
+        except ValueError as e:
+            raise RequestValidationError(
+                [{"loc": ("body",), "msg": str(e), "type": "value_error.jsondecode"}]
+            )
+
+    def parse_request(self, body: bytes) -> Request:
+        obj = self.loads(body=body)
+        if self.is_fast:
+            request = self.validator_request.validate(obj=obj)
+            if request is not None:
+                return request
+        try:
+            return Request.parse_obj(obj)
+        except ValidationError as e:
+            raise get_request_validation_error(e=e)
+
+    def parse_request_list(self, body: bytes) -> List[Request]:
+        """Fast path for the whole list, a single full validation otherwise."""
+        obj = self.loads(body=body)
+        if self.is_fast and type(obj) is list:
+            request_list = [self.validator_request.validate(obj=o) for o in obj]
+            if all(request is not None for request in request_list):
+                return request_list
+        try:
+            return parse_obj_as(List[Request], obj)
+        except ValidationError as e:
+            raise get_request_validation_error(e=e)
+
+    def render(self, content: Any) -> JSONResponse:
+        if self.is_fast:
+            return ORJSONResponse(content=content)
+        return JSONResponse(content=content)
@@ -1,4 +1,5 @@
 import os.path
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -6,10 +7,50 @@ from pydantic import BaseModel
 class Api(BaseModel):
     host: str = "0.0.0.0"
     port: int = 8000
+    is_codec_orjson: bool = False
+
+
+class Model(BaseModel):
+    path: Optional[str] = None
+    is_compiled: bool = False
+    is_mmap: bool = False
+    reload_interval_s: float = 10.0
+
+
+class Serve(BaseModel):
+    max_batch_size: int = 32
+    batch_wait_timeout_s: float = 0.005
+    max_concurrent_queries: int = 100
+    min_replicas: int = 1
+    max_replicas: int = 4
+    target_num_ongoing_requests_per_replica: int = 16
+
+
+class Worker(BaseModel):
+    worker_count: int = 4
+    max_queue_size: int = 64
+    queue_timeout_s: float = 1.0
+
+
+class State(BaseModel):
+    is_enabled: bool = False
+    key: str = "code"
+    window_s_list: List[int] = [3600, 86400]
+    ttl_s: int = 7 * 86400
+    snapshot_path: Optional[str] = None
+
+
+class Metrics(BaseModel):
+    is_enabled: bool = False
 
 
 class Conf(BaseModel):
     api: Api = Api()
+    model: Model = Model()
+    serve: Serve = Serve()
+    worker: Worker = Worker()
+    state: State = State()
+    metrics: Metrics = Metrics()
 
 
 def read_conf(env: str) -> Conf:
@@ -1,4 +1,14 @@
+import re
 from datetime import datetime
+from typing import Dict, Iterable
+
+import numpy as np
+
+# "%Y-%m-%d %H:%M:%S" with every field zero padded, strptime and numpy
+# datetime64 parse the strings it matches alike and reject the same ones
+FORMAT_PATTERN = re.compile(
+    r"[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}", flags=re.ASCII
+)
 
 
 class DateTime:
@@ -10,3 +20,45 @@ class DateTime:
 
     def get_obj(self, dt_str: str) -> datetime:
         return datetime.strptime(dt_str, self.format)
+
+    @staticmethod
+    def check_format(dt_str: str) -> str:
+        if FORMAT_PATTERN.fullmatch(dt_str) is None:
+            raise ValueError(
+                f"time data {dt_str!r} does not match format '%Y-%m-%d %H:%M:%S'"
+            )
+        return dt_str
+
+    @staticmethod
+    def get_datetime64_array(dt_str_list: Iterable[str]) -> np.ndarray:
+        return np.array(
+            [DateTime.check_format(dt_str=dt_str) for dt_str in dt_str_list],
+            dtype="datetime64[s]",
+        )
+
+    @staticmethod
+    def get_epoch_s(dt_str: str) -> int:
+        """Seconds since 1970-01-01 00:00:00, the string read as UTC."""
+        return int(
+            np.datetime64(DateTime.check_format(dt_str=dt_str), "s").astype(np.int64)
+        )
+
+    @staticmethod
+    def get_component_dict(dt_str_list: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Vectorized year, month, day, weekday and hour of format strings.
+
+        numpy parses "%Y-%m-%d %H:%M:%S" natively as datetime64, so the
+        components are computed with calendar unit casts instead of strptime.
+        """
+        dt = DateTime.get_datetime64_array(dt_str_list=dt_str_list)
+        dt_day = dt.astype("datetime64[D]")
+        dt_month = dt.astype("datetime64[M]")
+        day_count = dt_day.astype(np.int64)
+        return {
+            "dt_year": dt.astype("datetime64[Y]").astype(np.int64) + 1970,
+            "dt_month": dt_month.astype(np.int64) % 12 + 1,
+            "dt_day": (dt_day - dt_month).astype(np.int64) + 1,
+            # 1970-01-01 was a thursday, datetime.weekday() == 3
+            "dt_weekday": (day_count + 3) % 7,
+            "dt_hour": (dt - dt_day).astype("timedelta64[h]").astype(np.int64),
+        }
@@ -0,0 +1,243 @@
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import joblib
+import numpy as np
+
+from src.app.conf import State
+from src.app.date_time import DateTime
+from src.app.logger_custom import LoggerCustom
+from src.app.schema_pydantic import AMOUNT_MISSING, Transaction
+
+SINCE_LAST_MISSING = -1.0
+
+
+def get_feature_name_list(window_s_list: List[int]) -> List[str]:
+    return [
+        *(f"state_count_{window_s}s" for window_s in window_s_list),
+        *(f"state_amount_{window_s}s" for window_s in window_s_list),
+        "state_since_last_s",
+    ]
+
+
+class KeyState:
+    """Transactions of one key in a growable ring of typed arrays.
+
+    Each window keeps the sequence number of its oldest transaction and its
+    running amount, so a transaction costs O(1) amortized: it is appended once
+    and leaves each window once. The ring only holds the largest window.
+    """
+
+    __slots__ = (
+        "time_s",
+        "amount",
+        "mask",
+        "seq_start",
+        "seq_end",
+        "window_start",
+        "window_amount",
+        "time_last",
+        "time_prev",
+        "tail_count",
+        "tail_amount",
+    )
+
+    def __init__(self, window_count: int, capacity: int = 4):
+        self.time_s = array("q", [0]) * capacity
+        self.amount = array("d", [0.0]) * capacity
+        self.mask = capacity - 1
+        self.seq_start = 0
+        self.seq_end = 0
+        self.window_start = [0] * window_count
+        self.window_amount = [0.0] * window_count
+        # newest time, newest time before it, transactions at the newest time
+        self.time_last: Optional[int] = None
+        self.time_prev: Optional[int] = None
+        self.tail_count = 0
+        self.tail_amount = 0.0
+
+    def _grow(self):
+        capacity = 2 * (self.mask + 1)
+        time_s = array("q", [0]) * capacity
+        amount = array("d", [0.0]) * capacity
+        for seq in range(self.seq_start, self.seq_end):
+            time_s[seq & (capacity - 1)] = self.time_s[seq & self.mask]
+            amount[seq & (capacity - 1)] = self.amount[seq & self.mask]
+        self.time_s, self.amount, self.mask = time_s, amount, capacity - 1
+
+    def evict(self, time_s: int, window_s_list: List[int]):
+        """Drops from each window the transactions before time_s - window_s."""
+        for i, window_s in enumerate(window_s_list):
+            time_min = time_s - window_s
+            seq = self.window_start[i]
+            while seq < self.seq_end and self.time_s[seq & self.mask] < time_min:
+                self.window_amount[i] -= self.amount[seq & self.mask]
+                seq += 1
+            self.window_start[i] = seq
+            # the running sum drifts, an empty window is exactly 0
+            if seq == self.seq_end:
+                self.window_amount[i] = 0.0
+        # window_s_list is sorted, the largest window starts first
+        self.seq_start = self.window_start[-1]
+
+    def get_feature_list(self, time_s: int, ttl_s: int) -> List[float]:
+        """Window counts and amounts over [time_s - window_s, time_s - 1]."""
+        is_tail = time_s == self.time_last
+        tail_count = self.tail_count if is_tail else 0
+        tail_amount = self.tail_amount if is_tail else 0.0
+        time_before = self.time_prev if is_tail else self.time_last
+        return [
+            *(float(self.seq_end - start - tail_count) for start in self.window_start),
+            *(
+                amount - tail_amount if self.seq_end - start > tail_count else 0.0
+                for start, amount in zip(self.window_start, self.window_amount)
+            ),
+            (
+                float(time_s - time_before)
+                if time_before is not None and time_s - time_before <= ttl_s
+                else SINCE_LAST_MISSING
+            ),
+        ]
+
+    def append(self, time_s: int, amount: float):
+        if self.seq_end - self.seq_start > self.mask:
+            self._grow()
+        self.time_s[self.seq_end & self.mask] = time_s
+        self.amount[self.seq_end & self.mask] = amount
+        self.seq_end += 1
+        for i in range(len(self.window_amount)):
+            self.window_amount[i] += amount
+
+        if time_s == self.time_last:
+            self.tail_count += 1
+            self.tail_amount += amount
+        else:
+            self.time_prev = self.time_last
+            self.time_last = time_s
+            self.tail_count = 1
+            self.tail_amount = amount
+
+
+class FeatureState:
+    """Velocity features of the transactions seen so far, per key.
+
+    For a transaction at time t, per window: count and amount of the earlier
+    transactions of its key within [t - window_s, t - 1], missing amounts left
+    out of the sum, and the seconds since the previous one (-1 beyond ttl_s).
+    The transaction is added after its features are read. Data.get_df
+    computes the same columns with Spark windows, exactly so when
+    transactions arrive in time order; a late one is counted at the newest
+    time of its key.
+
+    Keys idle for ttl_s are evicted. The state lives in the process, each ray
+    serve replica holds its own.
+    """
+
+    def __init__(self, conf: State):
+        if conf.ttl_s < max(conf.window_s_list):
+            raise ValueError(f"ttl_s below the largest window: {conf}")
+        self.key = conf.key
+        self.window_s_list = sorted(conf.window_s_list)
+        self.ttl_s = conf.ttl_s
+        self.feature_name_list = get_feature_name_list(window_s_list=self.window_s_list)
+        # keys in order of their last transaction, for the ttl eviction
+        self.state_dict: "OrderedDict[str, KeyState]" = OrderedDict()
+        self.time_clock: Optional[int] = None
+        self._lock = threading.Lock()
+        self.logger = LoggerCustom().logger
+
+    def _evict_idle(self):
+        time_min = self.time_clock - self.ttl_s
+        while self.state_dict:
+            key, key_state = next(iter(self.state_dict.items()))
+            if key_state.time_last >= time_min:
+                return
+            del self.state_dict[key]
+
+    def _get_feature_list_and_update(self, key: str, time_s: int, amount: float):
+        # a missing amount counts as a transaction, not in the window amounts
+        if amount == AMOUNT_MISSING:
+            amount = 0.0
+        key_state = self.state_dict.get(key)
+        if key_state is None:
+            key_state = self.state_dict[key] = KeyState(
+                window_count=len(self.window_s_list)
+            )
+        else:
+            self.state_dict.move_to_end(key)
+            time_s = max(time_s, key_state.time_last)
+
+        key_state.evict(time_s=time_s, window_s_list=self.window_s_list)
+        feature_list = key_state.get_feature_list(time_s=time_s, ttl_s=self.ttl_s)
+        key_state.append(time_s=time_s, amount=amount)
+
+        if self.time_clock is None or time_s > self.time_clock:
+            self.time_clock = time_s
+            self._evict_idle()
+        return feature_list
+
+    def get_feature_dict(self, transaction: Transaction) -> Dict[str, float]:
+        """Features of the transaction, which then joins the state."""
+        with self._lock:
+            feature_list = self._get_feature_list_and_update(
+                key=getattr(transaction, self.key),
+                time_s=DateTime.get_epoch_s(dt_str=transaction.dtime),
+                amount=transaction.amount,
+            )
+        return dict(zip(self.feature_name_list, feature_list))
+
+    def get_feature_array_dict(
+        self, transaction_list: List[Transaction]
+    ) -> Dict[str, np.ndarray]:
+        """get_feature_dict of each transaction in list order, as columns."""
+        time_s_array = DateTime.get_datetime64_array(
+            dt_str_list=[t.dtime for t in transaction_list]
+        ).astype(np.int64)
+        with self._lock:
+            feature_list_list = [
+                self._get_feature_list_and_update(
+                    key=getattr(t, self.key), time_s=int(time_s), amount=t.amount
+                )
+                for t, time_s in zip(transaction_list, time_s_array)
+            ]
+        feature_array = np.array(feature_list_list, dtype=np.float64).reshape(
+            len(transaction_list), len(self.feature_name_list)
+        )
+        return {
+            name: feature_array[:, i] for i, name in enumerate(self.feature_name_list)
+        }
+
+    def save(self, path: str):
+        with self._lock:
+            joblib.dump(
+                {
+                    "window_s_list": self.window_s_list,
+                    "state_dict": self.state_dict,
+                    "time_clock": self.time_clock,
+                },
+                path,
+            )
+        self.logger.info(
+            f"feature state saved: {path} key_count={len(self.state_dict)}"
+        )
+
+    def load(self, path: str):
+        snapshot = joblib.load(path)
+        if snapshot["window_s_list"] != self.window_s_list:
+            raise ValueError(f"feature state windows differ: {path}")
+        with self._lock:
+            self.state_dict = snapshot["state_dict"]
+            self.time_clock = snapshot["time_clock"]
+        self.logger.info(
+            f"feature state loaded: {path} key_count={len(self.state_dict)}"
+        )
+
+    @classmethod
+    def from_conf(cls, conf: State) -> "FeatureState":
+        feature_state = cls(conf=conf)
+        if conf.snapshot_path is not None and os.path.isfile(conf.snapshot_path):
+            feature_state.load(path=conf.snapshot_path)
+        return feature_state
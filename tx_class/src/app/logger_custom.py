@@ -5,6 +5,9 @@ class LoggerCustom:
     def __init__(self):
         logger = logging.getLogger(__name__)
         logger.setLevel(logging.INFO)
+        self.logger = logger
+        if logger.handlers:
+            return
 
         handler = logging.StreamHandler()
         handler.setLevel(logging.INFO)
@@ -21,4 +24,3 @@ class LoggerCustom:
         )
         handler.setFormatter(formatter)
         logger.addHandler(handler)
-        self.logger = logger
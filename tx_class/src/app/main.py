@@ -1,20 +1,44 @@
 import time
+from typing import List
 
 from ray import serve
 
-from src.app.conf import read_conf
-from src.app.model import ModelClassification
+import src.app.service as service
 from src.app.prediction import Prediction
-from src.app.service import app  # Import the FastAPI app
+from src.app.schema_pydantic import Request, Response
+from src.app.service import app, model_registry  # Import the FastAPI app
+
+conf_serve = service.conf.serve
 
 serve.start()
 
 
-@serve.deployment
+@serve.deployment(
+    max_concurrent_queries=conf_serve.max_concurrent_queries,
+    autoscaling_config={
+        "min_replicas": conf_serve.min_replicas,
+        "max_replicas": conf_serve.max_replicas,
+        "target_num_ongoing_requests_per_replica": (
+            conf_serve.target_num_ongoing_requests_per_replica
+        ),
+    },
+)
 @serve.ingress(app)  # Wrap the FastAPI app with Ray Serve
 class FraudService:
     def __init__(self):
-        self.prediction = Prediction(model=ModelClassification())
+        app.state.predict_handler = self.predict_batched
+
+    @serve.batch(
+        max_batch_size=conf_serve.max_batch_size,
+        batch_wait_timeout_s=conf_serve.batch_wait_timeout_s,
+    )
+    async def predict_batched(self, request_list: List[Request]) -> List[Response]:
+        prediction = Prediction(
+            model=model_registry.get(), feature_state=service.feature_state
+        )
+        return await service.worker_pool.run(
+            fn=prediction.predict_batch, request_list=request_list
+        )
 
 
 FraudService.deploy()
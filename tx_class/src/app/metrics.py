@@ -0,0 +1,60 @@
+import time
+from contextlib import nullcontext
+
+from prometheus_client import Histogram
+
+
+class StageTimer:
+    """Prometheus histogram of the inference path durations, one label per stage.
+
+    When disabled time() returns a shared null context, so the hot path only
+    pays an attribute check and an empty with statement.
+    """
+
+    def __init__(self, is_enabled: bool = False):
+        self.is_enabled = is_enabled
+        self.histogram = Histogram(
+            "tx_class_stage_duration_seconds",
+            "Duration of a tx_class inference stage",
+            labelnames=["stage"],
+            buckets=(
+                0.0001,
+                0.00025,
+                0.0005,
+                0.001,
+                0.0025,
+                0.005,
+                0.01,
+                0.025,
+                0.05,
+                0.1,
+                0.25,
+                0.5,
+                1.0,
+            ),
+        )
+        self._null_context = nullcontext()
+
+    def time(self, stage: str):
+        if not self.is_enabled:
+            return self._null_context
+        return self.histogram.labels(stage=stage).time()
+
+    def observe_since(self, stage: str, time_start: float):
+        if self.is_enabled:
+            self.histogram.labels(stage=stage).observe(time.perf_counter() - time_start)
+
+
+class TimingMiddleware:
+    """ASGI middleware stamping the request arrival for the parsing stage."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            scope.setdefault("state", {})["time_start"] = time.perf_counter()
+        await self.app(scope, receive, send)
+
+
+stage_timer = StageTimer()
@@ -1,23 +1,56 @@
-from typing import Dict, List, Optional
-
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from copy import deepcopy
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+import joblib
 import numpy as np
 import pandas as pd
 from catboost import CatBoostClassifier
+from catboost.utils import quantize
 from pandas import DataFrame
 from pydantic import BaseModel
-from sklearn.base import BaseEstimator, TransformerMixin
+from scipy.sparse import csr_matrix
+from sklearn.base import BaseEstimator, TransformerMixin, clone
 from sklearn.compose import ColumnTransformer
 from sklearn.decomposition import LatentDirichletAllocation
 from sklearn.ensemble import IsolationForest
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.metrics import brier_score_loss, log_loss, roc_auc_score
-from sklearn.model_selection import GridSearchCV
+from sklearn.model_selection import (
+    GridSearchCV,
+    HalvingGridSearchCV,
+    RandomizedSearchCV,
+)
 from sklearn.pipeline import Pipeline
 
 from src.app.date_time import DateTime
 from src.app.logger_custom import LoggerCustom
+from src.app.metrics import stage_timer
 from src.app.schema_pydantic import Transaction, TransactionLabeled
 
+SearchCV = Union[GridSearchCV, RandomizedSearchCV, HalvingGridSearchCV]
+
+
+def dump_atomic(value, path: str):
+    """joblib.dump to a file next to path, then renamed onto path.
+
+    ModelRegistry reloads path while replicas serve it, possibly memory
+    mapped: they see the old artifact or the new one whole, the rename never
+    truncates the file they have mapped.
+    """
+    path_tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        joblib.dump(value, path_tmp)
+        os.replace(path_tmp, path)
+    finally:
+        if os.path.exists(path_tmp):
+            os.remove(path_tmp)
+
 
 class Schema:
     def __init__(self, df: DataFrame):
@@ -36,12 +69,18 @@ class ModelClassification:
     def predict_proba(X) -> float:
         return 0.9 if X["amount"] > 1000 else 0.1
 
+    @staticmethod
+    def predict_proba_batch(df: DataFrame) -> np.ndarray:
+        return np.where(df["amount"] > 1000, 0.9, 0.1)
+
     def get_feature_dict(self, transaction: Transaction) -> Dict:
         feature_dict = {
             "amount": transaction.amount,
             "transaction_type": transaction.transaction_type,
         }
-        dt = DateTime().get_obj(dt_str=transaction.dtime)
+        # strptime alone also takes unpadded fields, which numpy rejects in
+        # get_feature_df, the strict format keeps both paths in agreement
+        dt = DateTime().get_obj(dt_str=DateTime.check_format(dt_str=transaction.dtime))
         dt_dict = {
             "dt_year": dt.year,
             "dt_month": dt.month,
@@ -51,6 +90,17 @@ class ModelClassification:
         }
         return {**feature_dict, **dt_dict, **self.parse_code(code=transaction.code)}
 
+    def get_feature_df(self, transaction_list: List[Transaction]) -> DataFrame:
+        df = DataFrame(
+            {
+                "amount": [t.amount for t in transaction_list],
+                "transaction_type": [t.transaction_type for t in transaction_list],
+            }
+        )
+        dt_dict = DateTime.get_component_dict(t.dtime for t in transaction_list)
+        code_dict = self.parse_code_array(code_list=[t.code for t in transaction_list])
+        return df.assign(**dt_dict, **code_dict)
+
     def get_feature_and_label_dict(self, transaction: TransactionLabeled) -> Dict:
         return {
             **self.get_feature_dict(transaction=transaction),
@@ -61,6 +111,23 @@ class ModelClassification:
     def parse_code(code: str):
         return dict(map(lambda x_i: (f"code_{x_i[0]}", x_i[1]), enumerate(code)))
 
+    @staticmethod
+    def parse_code_array(code_list: List[str]) -> Dict[str, np.ndarray]:
+        """Columnar parse_code: fixed width char view, short codes give None.
+
+        Columns run up to the longest code, as the keys of parse_code do.
+        """
+        code_array = np.array(code_list, dtype=str)
+        width = int(np.char.str_len(code_array).max(initial=0))
+        char_array = (
+            code_array.astype(f"U{max(width, 1)}")
+            .view("U1")
+            .reshape(len(code_list), max(width, 1))
+            .astype(object)
+        )
+        char_array[char_array == ""] = None
+        return {f"code_{i}": char_array[:, i] for i in range(width)}
+
 
 class Evaluation(BaseModel):
     count: Optional[int]
@@ -74,6 +141,7 @@ class ModelCard(BaseModel):
     feat_importance: Dict[str, float]
     grid_search_cv_best_params: dict
     grid_search_cv_param_grid: dict
+    incremental_update: Optional[dict] = None
 
 
 class TokenizerTransformer(BaseEstimator, TransformerMixin):
@@ -86,28 +154,155 @@ class TokenizerTransformer(BaseEstimator, TransformerMixin):
 
     def transform(self, X):
         X = pd.DataFrame(X, columns=self.cat_cols)
-        X[self.col_token] = X.apply(
-            lambda row: " ".join([f"{col}|{val}" for col, val in row.items()]),
-            axis=1,
+        token = None
+        for col in self.cat_cols:
+            token_col = f"{col}|" + X[col].astype(str)
+            token = token_col if token is None else token + " " + token_col
+        return token.rename(self.col_token).values
+
+
+class TokenCountTransformer(BaseEstimator, TransformerMixin):
+    """Sparse col|val counts, TokenizerTransformer and CountVectorizer in one.
+
+    Categories are looked up per column so no token string is built or
+    re-tokenized. Note CountVectorizer splits col|val on its default token
+    pattern, so both vocabularies differ.
+    """
+
+    def __init__(self, cat_cols: list, min_df: float = 0.001):
+        self.cat_cols = cat_cols
+        self.min_df = min_df
+
+    def fit(self, X, y=None):
+        X = pd.DataFrame(X, columns=self.cat_cols)
+        min_count = (
+            self.min_df if isinstance(self.min_df, int) else self.min_df * len(X)
+        )
+        self.category_list_ = []
+        for col in self.cat_cols:
+            count = X[col].astype(str).value_counts()
+            self.category_list_.append(
+                pd.Index(sorted(count.index[count >= min_count]))
+            )
+        self.feature_names_ = [
+            f"{col}|{val}"
+            for col, categories in zip(self.cat_cols, self.category_list_)
+            for val in categories
+        ]
+        return self
+
+    def transform(self, X):
+        X = pd.DataFrame(X, columns=self.cat_cols)
+        row_list, col_list = [], []
+        offset = 0
+        for col, categories in zip(self.cat_cols, self.category_list_):
+            index = categories.get_indexer(X[col].astype(str))
+            is_known = index >= 0
+            row_list.append(np.flatnonzero(is_known))
+            col_list.append(index[is_known] + offset)
+            offset += len(categories)
+        row = np.concatenate(row_list)
+        return csr_matrix(
+            (np.ones(len(row), dtype=np.int64), (row, np.concatenate(col_list))),
+            shape=(len(X), offset),
         )
-        return X[self.col_token].values
 
 
 class LDATransformer(BaseEstimator, TransformerMixin):
-    def __init__(self, n_components: int = 2):
+    """LDA topics with a bounded LRU cache of topic vectors per count row.
+
+    The count row is a function of the categorical tuple, so repeated
+    combinations skip LDA inference. Rows are keyed by their sparse indices
+    and counts, never densified. fit_transform skips the cache, cache_size=0
+    disables it. The cache is shared by the threads scoring with one model,
+    a lock guards it while LDA inference runs outside of it.
+    """
+
+    def __init__(self, n_components: int = 2, cache_size: int = 4096):
         self.n_components = n_components
+        self.cache_size = cache_size
         self.lda_model = LatentDirichletAllocation(n_components=self.n_components)
         self.feature_names_ = None
 
     def fit(self, X, y=None):
         self.lda_model.fit(X)
-        self.feature_names_ = [f"topic_{i}" for i in range(self.n_components)]
+        self._init_cache()
         return self
 
-    def transform(self, X):
-        lda_features = self.lda_model.transform(X)
+    def fit_transform(self, X, y=None):
+        # training rows are nearly all distinct, the cache would only churn
+        lda_features = self.lda_model.fit_transform(X)
+        self._init_cache()
         return lda_features
 
+    def _init_cache(self):
+        self.feature_names_ = [f"topic_{i}" for i in range(self.n_components)]
+        self.cache_ = OrderedDict()
+        self.cache_hit_count_ = 0
+        self.cache_miss_count_ = 0
+        self._cache_lock = threading.Lock()
+
+    def __getstate__(self):
+        # object.__getstate__ may return the live __dict__, not a copy
+        state = dict(super().__getstate__())
+        state.pop("_cache_lock", None)
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self._cache_lock = threading.Lock()
+
+    def transform(self, X):
+        if not self.cache_size:
+            return self.lda_model.transform(X)
+
+        X = csr_matrix(X)
+        if not X.has_canonical_format:
+            X = X.copy()
+            X.sum_duplicates()
+        indptr, indices, data = X.indptr, X.indices, X.data
+        # first row of each distinct key, and the key index of each row
+        key_dict: Dict[tuple, int] = {}
+        row_unique_list = []
+        inverse = np.empty(X.shape[0], dtype=np.intp)
+        for i in range(X.shape[0]):
+            start, end = indptr[i], indptr[i + 1]
+            key = (indices[start:end].tobytes(), data[start:end].tobytes())
+            inverse[i] = key_dict.setdefault(key, len(key_dict))
+            if inverse[i] == len(row_unique_list):
+                row_unique_list.append(i)
+        key_list = list(key_dict)
+        lda_features_unique = np.empty((len(key_list), self.n_components))
+        is_miss = np.ones(len(key_list), dtype=bool)
+        with self._cache_lock:
+            for i, key in enumerate(key_list):
+                lda_features = self.cache_.get(key)
+                if lda_features is not None:
+                    lda_features_unique[i] = lda_features
+                    is_miss[i] = False
+                    self.cache_.move_to_end(key)
+
+        if is_miss.any():
+            lda_features_unique[is_miss] = self.lda_model.transform(
+                X[np.asarray(row_unique_list)[is_miss]]
+            )
+        with self._cache_lock:
+            for i in np.flatnonzero(is_miss):
+                self.cache_[key_list[i]] = lda_features_unique[i]
+            while len(self.cache_) > self.cache_size:
+                self.cache_.popitem(last=False)
+            self.cache_miss_count_ += int(is_miss.sum())
+            self.cache_hit_count_ += len(key_list) - int(is_miss.sum())
+        return lda_features_unique[inverse]
+
+    def get_cache_info(self) -> Dict[str, int]:
+        return {
+            "hit_count": self.cache_hit_count_,
+            "miss_count": self.cache_miss_count_,
+            "size": len(self.cache_),
+            "max_size": self.cache_size,
+        }
+
 
 class IsolationForestTransformer(BaseEstimator, TransformerMixin):
     def __init__(self, feature_cols=None):
@@ -127,18 +322,31 @@ class IsolationForestTransformer(BaseEstimator, TransformerMixin):
         return np.hstack([X, anomaly_scores])
 
 
-class ModelClassificationCatBoost:
-    def __init__(self):
+class ModelClassificationCatBoost(ModelClassification):
+    def __init__(
+        self,
+        is_token_count_direct: bool = False,
+        search: str = "grid",
+        search_n_iter: int = 10,
+    ):
+        self.is_token_count_direct = is_token_count_direct
+        self.search = search
+        self.search_n_iter = search_n_iter
         self.df: pd.DataFrame = None
         self.pipeline: Pipeline = None
         self.schema: Schema = None
+        self.param_grid: dict = None
         self.logger = LoggerCustom().logger
 
     def build_pipeline(self) -> Pipeline:
         col_token = "token_str"
 
-        lda_pipeline = Pipeline(
-            [
+        if self.is_token_count_direct:
+            token_count_step_list = [
+                ("token_count", TokenCountTransformer(cat_cols=self.schema.x_cat)),
+            ]
+        else:
+            token_count_step_list = [
                 (
                     "token_transformer",
                     TokenizerTransformer(
@@ -146,9 +354,8 @@ class ModelClassificationCatBoost:
                     ),
                 ),
                 ("count_vectorizer", CountVectorizer(min_df=0.001)),
-                ("lda", LDATransformer()),
             ]
-        )
+        lda_pipeline = Pipeline(token_count_step_list + [("lda", LDATransformer())])
 
         feature_combiner = ColumnTransformer(
             [
@@ -201,7 +408,54 @@ class ModelClassificationCatBoost:
 
         return x_input_classifier
 
-    def _fit_cv(self, df: pd.DataFrame) -> GridSearchCV:
+    def get_lda_cache_info(self) -> Dict[str, int]:
+        column_transformer = self.pipeline.named_steps["combined_features"].named_steps[
+            "combine_features"
+        ]
+        lda_pipeline = column_transformer.named_transformers_["lda_features"]
+        return lda_pipeline.named_steps["lda"].get_cache_info()
+
+    def build_search_cv(self, pipeline: Pipeline, param_grid: dict) -> SearchCV:
+        scoring = {
+            "neg_log_loss": "neg_log_loss",
+            "roc_auc": "roc_auc",
+        }
+        if self.search == "grid":
+            return GridSearchCV(
+                estimator=pipeline,
+                param_grid=param_grid,
+                scoring=scoring,
+                cv=2,
+                refit="neg_log_loss",
+                n_jobs=-1,
+                verbose=1,
+            )
+        if self.search == "random":
+            return RandomizedSearchCV(
+                estimator=pipeline,
+                param_distributions=param_grid,
+                n_iter=self.search_n_iter,
+                scoring=scoring,
+                cv=2,
+                refit="neg_log_loss",
+                n_jobs=-1,
+                verbose=1,
+                random_state=42,
+            )
+        if self.search == "halving":
+            # successive halving supports a single metric only
+            return HalvingGridSearchCV(
+                estimator=pipeline,
+                param_grid=param_grid,
+                scoring="neg_log_loss",
+                cv=2,
+                n_jobs=-1,
+                verbose=1,
+                random_state=42,
+            )
+        raise ValueError(f"search not supported: {self.search}")
+
+    def _fit_cv(self, df: pd.DataFrame) -> SearchCV:
         self.schema = Schema(df=df)
         df = self.prepare_df(df=df)
 
@@ -214,48 +468,115 @@ class ModelClassificationCatBoost:
                 "n_components",
             ]
         )
-        grid_search_cv = GridSearchCV(
-            estimator=self.build_pipeline(),
-            param_grid={
-                lda_n_components: [
-                    3,
-                ],
-                "cat_boost_classifier__iterations": [10],
-                "cat_boost_classifier__depth": [3, 4],
-            },
-            scoring={
-                "neg_log_loss": "neg_log_loss",
-                "roc_auc": "roc_auc",
-            },
-            cv=2,
-            refit="neg_log_loss",
-            n_jobs=-1,
-            verbose=1,
-        )
+        param_grid = {
+            lda_n_components: [
+                3,
+            ],
+            "cat_boost_classifier__iterations": [10],
+            "cat_boost_classifier__depth": [3, 4],
+        }
 
-        grid_search_cv.fit(X=df[self.schema.x], y=df[self.schema.y])
+        # upstream stages are fitted once per fold and upstream params,
+        # catboost candidates reuse them from the pipeline memory
+        memory_dir = tempfile.mkdtemp(prefix="tx_class_cv_")
+        pipeline = self.build_pipeline()
+        pipeline.set_params(memory=memory_dir)
+        try:
+            grid_search_cv = self.build_search_cv(
+                pipeline=pipeline, param_grid=param_grid
+            )
+            grid_search_cv.fit(X=df[self.schema.x], y=df[self.schema.y])
+        finally:
+            shutil.rmtree(memory_dir, ignore_errors=True)
 
         self.pipeline = grid_search_cv.best_estimator_
+        self.pipeline.set_params(memory=None)
+        self.param_grid = param_grid
 
         self.schema.x_input_classifier = self.get_x_input_classifier()
 
         return grid_search_cv
 
-    def prepare_df(self, df: DataFrame) -> DataFrame:
-        df[self.schema.x_cat] = df[self.schema.x_cat].astype(str).fillna("unknown")
-        df[self.schema.x_num] = df[self.schema.x_num].fillna(-999999.9)
+    def prepare_df(self, df: DataFrame, dtype_cat="category") -> DataFrame:
+        """Copy of df with x filled and x_cat as dtype_cat, df is not mutated.
+
+        The copy is flagged in attrs and passed through as is afterwards, so
+        fit, evaluation and importance share one prepared frame. Categorical
+        dtype keeps a single code array per column instead of string copies.
+        """
+        if df.attrs.get("x_prepared") == self.schema.x:
+            return df
+        column_dict = {}
+        for col in df.columns:
+            if col in self.schema.x_cat:
+                column_dict[col] = df[col].fillna("unknown").astype(str)
+                if dtype_cat is not str:
+                    column_dict[col] = column_dict[col].astype(dtype_cat)
+            elif col in self.schema.x_num:
+                column_dict[col] = df[col].fillna(-999999.9)
+            else:
+                column_dict[col] = df[col]
+        df = DataFrame(column_dict, index=df.index)
+        df.attrs["x_prepared"] = self.schema.x
         return df
 
     def get_prob(self, df: DataFrame, pipeline: Pipeline) -> np.ndarray:
-        df = self.prepare_df(df=df[self.schema.x])
-        return pipeline.predict_proba(X=df)[:, 1]
+        df = self.prepare_df(df=df)
+        if stage_timer.is_enabled:
+            return self.get_prob_staged(X=df[self.schema.x], pipeline=pipeline)
+        return pipeline.predict_proba(X=df[self.schema.x])[:, 1]
+
+    def get_prob_staged(self, X: DataFrame, pipeline: Pipeline) -> np.ndarray:
+        """pipeline.predict_proba run step by step to time every stage."""
+        combined_features = pipeline.named_steps["combined_features"]
+        column_transformer = combined_features.named_steps["combine_features"]
+
+        X_lda = X[self.schema.x_cat]
+        for name, step in column_transformer.named_transformers_["lda_features"].steps:
+            with stage_timer.time(name):
+                X_lda = step.transform(X_lda)
+        X_combined = np.hstack([X_lda, X[self.schema.x_num].to_numpy()])
+
+        with stage_timer.time("isolation_forest"):
+            X_combined = combined_features.named_steps["isolation_forest"].transform(
+                X_combined
+            )
+        with stage_timer.time("cat_boost_classifier"):
+            return pipeline.named_steps["cat_boost_classifier"].predict_proba(
+                X_combined
+            )[:, 1]
+
+    def predict_proba(self, X: Dict) -> float:
+        return float(self.predict_proba_batch(df=DataFrame([X]))[0])
+
+    def predict_proba_batch(self, df: DataFrame) -> np.ndarray:
+        # codes shorter than in training lack code_i columns, scored as unknown
+        df = df.reindex(columns=self.schema.x)
+        # online frames are small, str skips the category conversion cost
+        return self.get_prob(
+            df=self.prepare_df(df=df, dtype_cat=str), pipeline=self.pipeline
+        )
 
     def get_evaluation(self, df: DataFrame) -> Evaluation:
-        y_prob = self.get_prob(df=df, pipeline=self.pipeline)
-        y_true = df[self.schema.y]
+        return self.get_evaluation_prob(
+            y_true=df[self.schema.y],
+            y_prob=self.get_prob(df=df, pipeline=self.pipeline),
+        )
+
+    def get_evaluation_stream(
+        self, batch_iter: Callable[[], Iterable[DataFrame]]
+    ) -> Evaluation:
+        y_true_list, y_prob_list = [], []
+        for df in batch_iter():
+            y_true_list.append(df[self.schema.y].to_numpy())
+            y_prob_list.append(self.get_prob(df=df, pipeline=self.pipeline))
+        return self.get_evaluation_prob(
+            y_true=np.concatenate(y_true_list), y_prob=np.concatenate(y_prob_list)
+        )
 
+    def get_evaluation_prob(self, y_true, y_prob: np.ndarray) -> Evaluation:
         evaluation = Evaluation(
-            count=len(df),
+            count=len(y_true),
             roc_auc=roc_auc_score(
                 y_score=y_prob,
                 y_true=y_true,
@@ -272,14 +593,21 @@ class ModelClassificationCatBoost:
         self.logger.info(f"evaluation: {evaluation}")
         return evaluation
 
-    def get_evaluation_train_cv(self, grid_search_cv: GridSearchCV) -> Evaluation:
+    def get_evaluation_train_cv(self, grid_search_cv: SearchCV) -> Evaluation:
         index = grid_search_cv.best_index_
         result_dict = grid_search_cv.cv_results_
+        # halving search scores a single metric, stored as score
+        neg_log_loss = (
+            result_dict["mean_test_neg_log_loss"]
+            if "mean_test_neg_log_loss" in result_dict
+            else result_dict["mean_test_score"]
+        )
+        roc_auc = result_dict.get("mean_test_roc_auc")
 
         evaluation = Evaluation(
             count=None,
-            log_loss=-np.mean(result_dict["mean_test_neg_log_loss"][index]),
-            roc_auc=np.mean(result_dict["mean_test_roc_auc"][index]),
+            log_loss=-np.mean(neg_log_loss[index]),
+            roc_auc=-1 if roc_auc is None else np.mean(roc_auc[index]),
             brier_score_loss=-1,
         )
         self.logger.info(f"evaluation: {evaluation}")
@@ -324,8 +652,168 @@ class ModelClassificationCatBoost:
                 "train_cv": self.get_evaluation_train_cv(grid_search_cv=grid_search_cv),
             },
             feat_importance=self.get_feature_importance(),
-            grid_search_cv_param_grid=grid_search_cv.param_grid,
+            grid_search_cv_param_grid=self.param_grid,
+            grid_search_cv_best_params=grid_search_cv.best_params_,
+        )
+        self.logger.info(f"model_card: {model_card}")
+        self.logger.info(f"lda cache: {self.get_lda_cache_info()}")
+        return model_card
+
+    @staticmethod
+    def get_sample(
+        batch_iter: Callable[[], Iterable[DataFrame]], count: int, seed: int = 42
+    ) -> DataFrame:
+        """Uniform random sample of count rows over all the batches.
+
+        Each row gets a random key and the count smallest keys are kept, so at
+        most count rows plus one batch are in memory. Rows keep their order.
+        """
+        rng = np.random.default_rng(seed)
+        df_sample, key_sample = None, np.empty(0)
+        for df in batch_iter():
+            key = np.concatenate([key_sample, rng.random(len(df))])
+            df_sample = pd.concat([df_sample, df], ignore_index=True)
+            index = np.sort(np.argsort(key, kind="stable")[:count])
+            df_sample = df_sample.iloc[index].reset_index(drop=True)
+            key_sample = key[index]
+        return df_sample
+
+    def train_and_evaluate_stream(
+        self,
+        batch_iter_train: Callable[[], Iterable[DataFrame]],
+        batch_iter_test: Callable[[], Iterable[DataFrame]],
+        sample_count: int = 100_000,
+    ) -> ModelCard:
+        """train_and_evaluate with the train set never fully in memory.
+
+        The search and the upstream stages fit on a uniform random sample of
+        sample_count train rows. Then the train batches are transformed one at
+        a time into an on-disk file, quantized into a CatBoost pool without
+        loading its float values, and the best CatBoost is refitted on all of
+        it. Each call of a batch_iter_* starts a new pass over its batches.
+        """
+        df_sample = self.get_sample(batch_iter=batch_iter_train, count=sample_count)
+
+        grid_search_cv = self._fit_cv(df=df_sample)
+
+        combined_features = self.pipeline.named_steps["combined_features"]
+        with tempfile.TemporaryDirectory(prefix="tx_class_pool_") as dir_name:
+            path_pool = os.path.join(dir_name, "train.tsv")
+            path_cd = os.path.join(dir_name, "train.cd")
+            with open(path_cd, "w") as f:
+                f.write("0\tLabel\n")
+            with open(path_pool, "w") as f:
+                for df in batch_iter_train():
+                    df = self.prepare_df(df=df)
+                    X = combined_features.transform(X=df[self.schema.x])
+                    np.savetxt(
+                        f,
+                        np.column_stack([df[self.schema.y].to_numpy(), X]),
+                        delimiter="\t",
+                    )
+
+            cat_boost_classifier = clone(
+                self.pipeline.named_steps["cat_boost_classifier"]
+            )
+            # read in blocks, only the quantized pool is held in memory
+            pool = quantize(
+                data_path=path_pool,
+                column_description=path_cd,
+                border_count=cat_boost_classifier.get_params().get("border_count"),
+            )
+            self.logger.info(f"pool: {pool.num_row()} rows, quantized")
+            cat_boost_classifier.fit(pool)
+        self.pipeline.steps[-1] = ("cat_boost_classifier", cat_boost_classifier)
+
+        model_card = ModelCard(
+            evaluation_dict={
+                "train": self.get_evaluation_stream(batch_iter=batch_iter_train),
+                "test": self.get_evaluation_stream(batch_iter=batch_iter_test),
+                "train_cv": self.get_evaluation_train_cv(grid_search_cv=grid_search_cv),
+            },
+            feat_importance=self.get_feature_importance(),
+            grid_search_cv_param_grid=self.param_grid,
             grid_search_cv_best_params=grid_search_cv.best_params_,
         )
         self.logger.info(f"model_card: {model_card}")
         return model_card
+
+    def train_and_evaluate_incremental(
+        self,
+        df_train: DataFrame,
+        df_test: DataFrame,
+        iterations: int = 10,
+        log_loss_tolerance: float = 0.01,
+    ) -> ModelCard:
+        """Warm start of the fitted pipeline on new data, without search.
+
+        The token vocabulary, LDA and IsolationForest are kept, so the
+        classifier inputs keep their meaning. CatBoost adds iterations trees to the
+        current ones through init_model. The update replaces the pipeline
+        only if its test log loss is within log_loss_tolerance (relative) of
+        the current pipeline test log loss.
+        """
+        if self.pipeline is None:
+            raise ValueError("incremental training needs a fitted pipeline")
+        if Schema(df=df_train).x != self.schema.x:
+            raise ValueError(f"df_train columns differ from the schema: {df_train}")
+        df_train = self.prepare_df(df=df_train)
+        df_test = self.prepare_df(df=df_test)
+        evaluation_previous = self.get_evaluation(df=df_test)
+
+        pipeline = deepcopy(self.pipeline)
+        combined_features = pipeline.named_steps["combined_features"]
+        cat_boost_classifier = pipeline.named_steps["cat_boost_classifier"]
+        cat_boost_classifier_update = clone(cat_boost_classifier).set_params(
+            iterations=iterations
+        )
+        cat_boost_classifier_update.fit(
+            combined_features.transform(X=df_train[self.schema.x]),
+            df_train[self.schema.y],
+            init_model=cat_boost_classifier,
+        )
+        pipeline.steps[-1] = ("cat_boost_classifier", cat_boost_classifier_update)
+
+        evaluation_update = self.get_evaluation_prob(
+            y_true=df_test[self.schema.y],
+            y_prob=self.get_prob(df=df_test, pipeline=pipeline),
+        )
+        log_loss_max = evaluation_previous.log_loss * (1 + log_loss_tolerance)
+        is_update = evaluation_update.log_loss <= log_loss_max
+        if is_update:
+            self.pipeline = pipeline
+        else:
+            self.logger.warning(
+                f"update rejected: log_loss={evaluation_update.log_loss} "
+                f"above {log_loss_max}, the previous pipeline is kept"
+            )
+
+        model_card = ModelCard(
+            evaluation_dict={
+                "train": self.get_evaluation(df=df_train),
+                "test": evaluation_update if is_update else evaluation_previous,
+                "test_previous": evaluation_previous,
+                "test_update": evaluation_update,
+            },
+            feat_importance=self.get_feature_importance(),
+            grid_search_cv_param_grid=self.param_grid or {},
+            grid_search_cv_best_params={},
+            incremental_update={"iterations": iterations, "is_update": is_update},
+        )
+        self.logger.info(f"model_card: {model_card}")
+        return model_card
+
+    def save(self, path: str):
+        dump_atomic({"pipeline": self.pipeline, "schema": self.schema}, path=path)
+        self.logger.info(f"model saved: {path}")
+
+    @classmethod
+    def load(
+        cls, path: str, mmap_mode: Optional[str] = None
+    ) -> "ModelClassificationCatBoost":
+        artifact = joblib.load(path, mmap_mode=mmap_mode)
+        model = cls()
+        model.pipeline = artifact["pipeline"]
+        model.schema = artifact["schema"]
+        model.logger.info(f"model loaded: {path}")
+        return model
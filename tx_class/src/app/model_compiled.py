@@ -0,0 +1,307 @@
+import os
+import re
+import tempfile
+from typing import Dict, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from catboost import CatBoostClassifier
+from pandas import DataFrame
+from scipy.special import psi
+
+from src.app.logger_custom import LoggerCustom
+from src.app.metrics import stage_timer
+from src.app.model import (
+    ModelClassification,
+    ModelClassificationCatBoost,
+    dump_atomic,
+)
+
+TREE_ARRAY_LIST = [
+    "children_left",
+    "children_right",
+    "feature",
+    "threshold",
+    "leaf_value",
+]
+
+
+def get_average_path_length(n_samples: np.ndarray) -> np.ndarray:
+    """Average path length of an unsuccessful BST search, as in IsolationForest."""
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    path_length = np.zeros_like(n_samples)
+    is_two = n_samples == 2
+    is_more = n_samples > 2
+    path_length[is_two] = 1.0
+    n = n_samples[is_more]
+    path_length[is_more] = (
+        2.0 * (np.log(n - 1.0) + np.euler_gamma) - 2.0 * (n - 1.0) / n
+    )
+    return path_length
+
+
+def get_node_depth(children_left: np.ndarray, children_right: np.ndarray):
+    depth = np.zeros(len(children_left), dtype=np.int64)
+    for node in range(len(children_left)):
+        if children_left[node] != -1:
+            depth[children_left[node]] = depth[node] + 1
+            depth[children_right[node]] = depth[node] + 1
+    return depth
+
+
+class TreeCompiled:
+    """Isolation tree as flat arrays, leaves hold their path length."""
+
+    def __init__(self, tree, feature_index: np.ndarray):
+        tree_ = tree.tree_
+        self.children_left = tree_.children_left
+        self.children_right = tree_.children_right
+        self.feature = feature_index[np.maximum(tree_.feature, 0)]
+        self.threshold = tree_.threshold
+        # decision_path node count - 1 + average path length of the leaf
+        self.leaf_value = get_node_depth(
+            children_left=self.children_left, children_right=self.children_right
+        ) + get_average_path_length(n_samples=tree_.n_node_samples)
+
+    @classmethod
+    def from_array_dict(cls, array_dict: Dict[str, np.ndarray]) -> "TreeCompiled":
+        tree = cls.__new__(cls)
+        for name in TREE_ARRAY_LIST:
+            setattr(tree, name, array_dict[name])
+        return tree
+
+    def get_path_length(self, X: np.ndarray) -> np.ndarray:
+        node = np.zeros(len(X), dtype=np.int64)
+        row = np.arange(len(X))
+        while True:
+            is_split = self.children_left[node[row]] != -1
+            row = row[is_split]
+            if len(row) == 0:
+                return self.leaf_value[node]
+            node_row = node[row]
+            is_left = X[row, self.feature[node_row]] <= self.threshold[node_row]
+            node[row] = np.where(
+                is_left, self.children_left[node_row], self.children_right[node_row]
+            )
+
+
+class ModelCompiled(ModelClassification):
+    """Fitted ModelClassificationCatBoost.pipeline flattened to numpy arrays.
+
+    token -> count -> LDA -> IsolationForest run as batched array operations
+    and CatBoost scores from its native model, no sklearn Pipeline involved.
+    """
+
+    def __init__(self):
+        self.x_cat: List[str] = []
+        self.x_num: List[str] = []
+        self.token_vocabulary: Dict[str, int] = {}
+        self.token_pattern: Optional[str] = None
+        self.lda_exp_topic_word: np.ndarray = None
+        self.lda_doc_topic_prior: float = None
+        self.lda_max_doc_update_iter: int = None
+        self.lda_mean_change_tol: float = None
+        self.tree_list: List[TreeCompiled] = []
+        self.if_offset: float = None
+        self.if_denominator: float = None
+        self.catboost_blob: np.ndarray = None
+        self.catboost: CatBoostClassifier = None
+        # tree_list as a few large arrays, only set inside the artifact
+        self.forest_dict: Optional[Dict[str, np.ndarray]] = None
+        self.logger = LoggerCustom().logger
+
+    @classmethod
+    def from_model(cls, model: ModelClassificationCatBoost) -> "ModelCompiled":
+        compiled = cls()
+        compiled.x_cat = list(model.schema.x_cat)
+        compiled.x_num = list(model.schema.x_num)
+
+        combined_features = model.pipeline.named_steps["combined_features"]
+        column_transformer = combined_features.named_steps["combine_features"]
+        lda_pipeline = column_transformer.named_transformers_["lda_features"]
+        compiled._set_token(lda_pipeline=lda_pipeline)
+        compiled._set_lda(lda=lda_pipeline.named_steps["lda"].lda_model)
+        compiled._set_isolation_forest(
+            isolation_forest=combined_features.named_steps["isolation_forest"]
+        )
+
+        with tempfile.TemporaryDirectory() as dir_name:
+            path = os.path.join(dir_name, "catboost.cbm")
+            model.pipeline.named_steps["cat_boost_classifier"].save_model(path)
+            with open(path, "rb") as f:
+                compiled.catboost_blob = np.frombuffer(f.read(), dtype=np.uint8)
+        compiled.catboost = CatBoostClassifier().load_model(
+            blob=bytes(compiled.catboost_blob)
+        )
+        return compiled
+
+    def _set_token(self, lda_pipeline):
+        if "token_count" in lda_pipeline.named_steps:
+            token_count = lda_pipeline.named_steps["token_count"]
+            self.token_vocabulary = {
+                token: i for i, token in enumerate(token_count.feature_names_)
+            }
+            self.token_pattern = None
+            return
+
+        count_vectorizer = lda_pipeline.named_steps["count_vectorizer"]
+        if (
+            count_vectorizer.analyzer != "word"
+            or count_vectorizer.ngram_range != (1, 1)
+            or count_vectorizer.tokenizer is not None
+            or count_vectorizer.preprocessor is not None
+            or count_vectorizer.stop_words is not None
+            or not count_vectorizer.lowercase
+        ):
+            raise ValueError(f"CountVectorizer not supported: {count_vectorizer}")
+        self.token_vocabulary = dict(count_vectorizer.vocabulary_)
+        self.token_pattern = count_vectorizer.token_pattern
+
+    def _set_lda(self, lda):
+        self.lda_exp_topic_word = lda.exp_dirichlet_component_
+        self.lda_doc_topic_prior = lda.doc_topic_prior_
+        self.lda_max_doc_update_iter = lda.max_doc_update_iter
+        self.lda_mean_change_tol = lda.mean_change_tol
+
+    def _set_isolation_forest(self, isolation_forest):
+        model = isolation_forest.model
+        feature_cols = np.asarray(isolation_forest.feature_cols)
+        is_subsample = model._max_features != len(feature_cols)
+        self.tree_list = [
+            TreeCompiled(
+                tree=tree,
+                feature_index=feature_cols[features] if is_subsample else feature_cols,
+            )
+            for tree, features in zip(model.estimators_, model.estimators_features_)
+        ]
+        self.if_offset = model.offset_
+        self.if_denominator = (
+            len(model.estimators_)
+            * get_average_path_length(n_samples=[model.max_samples_])[0]
+        )
+
+    def get_token_index_list(self, col: str, val: str) -> List[int]:
+        token = f"{col}|{val}"
+        if self.token_pattern is None:
+            token_list = [token]
+        else:
+            token_list = re.findall(self.token_pattern, token.lower())
+        return [
+            self.token_vocabulary[t] for t in token_list if t in self.token_vocabulary
+        ]
+
+    def get_count(self, df: DataFrame) -> np.ndarray:
+        count = np.zeros((len(df), len(self.token_vocabulary)))
+        for col in self.x_cat:
+            code, uniques = pd.factorize(df[col].fillna("unknown").astype(str))
+            count_unique = np.zeros((len(uniques), len(self.token_vocabulary)))
+            for i, val in enumerate(uniques):
+                for index in self.get_token_index_list(col=col, val=val):
+                    count_unique[i, index] += 1
+            count += count_unique[code]
+        return count
+
+    def get_topic(self, count: np.ndarray) -> np.ndarray:
+        """LatentDirichletAllocation.transform E-step, all documents at once."""
+        exp_topic_word = self.lda_exp_topic_word
+        eps = np.finfo(count.dtype).eps
+
+        doc_topic = np.ones((len(count), len(exp_topic_word)))
+        exp_doc_topic = np.exp(psi(doc_topic) - psi(doc_topic.sum(axis=1))[:, None])
+        row = np.arange(len(count))
+        for _ in range(self.lda_max_doc_update_iter):
+            if len(row) == 0:
+                break
+            exp_doc_topic_row = exp_doc_topic[row]
+            norm_phi = exp_doc_topic_row @ exp_topic_word + eps
+            doc_topic_row = (
+                exp_doc_topic_row * ((count[row] / norm_phi) @ exp_topic_word.T)
+                + self.lda_doc_topic_prior
+            )
+            mean_change = np.abs(doc_topic_row - doc_topic[row]).mean(axis=1)
+            doc_topic[row] = doc_topic_row
+            exp_doc_topic[row] = np.exp(
+                psi(doc_topic_row) - psi(doc_topic_row.sum(axis=1))[:, None]
+            )
+            row = row[mean_change >= self.lda_mean_change_tol]
+
+        return doc_topic / doc_topic.sum(axis=1)[:, None]
+
+    def get_anomaly_score(self, X: np.ndarray) -> np.ndarray:
+        X = X.astype(np.float32)
+        depth = np.zeros(len(X))
+        for tree in self.tree_list:
+            depth += tree.get_path_length(X=X)
+        score = 2 ** -(depth / self.if_denominator if self.if_denominator else 1.0)
+        return -score - self.if_offset
+
+    def predict_proba(self, X: Dict) -> float:
+        return float(self.predict_proba_batch(df=DataFrame([X]))[0])
+
+    def predict_proba_batch(self, df: DataFrame) -> np.ndarray:
+        df = df.reindex(columns=self.x_cat + self.x_num)
+        with stage_timer.time("token_count"):
+            count = self.get_count(df=df)
+        with stage_timer.time("lda"):
+            topic = self.get_topic(count=count)
+        X = np.hstack(
+            [topic, df[self.x_num].fillna(-999999.9).to_numpy(dtype=np.float64)]
+        )
+        with stage_timer.time("isolation_forest"):
+            X = np.hstack([X, self.get_anomaly_score(X=X)[:, None]])
+        with stage_timer.time("cat_boost_classifier"):
+            return self.catboost.predict_proba(X)[:, 1]
+
+    def get_forest_dict(self) -> Dict[str, np.ndarray]:
+        """tree_list concatenated per array, with the tree node offsets."""
+        forest_dict = {
+            name: np.concatenate([getattr(tree, name) for tree in self.tree_list])
+            for name in TREE_ARRAY_LIST
+        }
+        forest_dict["offset"] = np.cumsum(
+            [0] + [len(tree.children_left) for tree in self.tree_list]
+        )
+        return forest_dict
+
+    def set_tree_list(self, forest_dict: Dict[str, np.ndarray]):
+        """tree_list as views of the forest arrays, memory maps stay shared."""
+        offset = forest_dict["offset"]
+        self.tree_list = [
+            TreeCompiled.from_array_dict(
+                array_dict={
+                    name: forest_dict[name][start:end] for name in TREE_ARRAY_LIST
+                }
+            )
+            for start, end in zip(offset[:-1], offset[1:])
+        ]
+
+    def save(self, path: str):
+        """Uncompressed joblib artifact, its arrays can be memory mapped."""
+        catboost, logger, tree_list = self.catboost, self.logger, self.tree_list
+        self.forest_dict = self.get_forest_dict()
+        self.catboost, self.logger, self.tree_list = None, None, []
+        try:
+            dump_atomic(self, path=path)
+        finally:
+            self.catboost, self.logger, self.tree_list = catboost, logger, tree_list
+            self.forest_dict = None
+        self.logger.info(f"model compiled saved: {path}")
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = None) -> "ModelCompiled":
+        """Artifact written by save, its arrays memory mapped with mmap_mode "r".
+
+        The replicas of a node then share the arrays through the page cache.
+        CatBoost keeps its own copy of the model, built from the blob.
+        """
+        compiled = joblib.load(path, mmap_mode=mmap_mode)
+        if getattr(compiled, "forest_dict", None) is not None:
+            compiled.set_tree_list(forest_dict=compiled.forest_dict)
+            compiled.forest_dict = None
+        compiled.catboost = CatBoostClassifier().load_model(
+            blob=bytes(compiled.catboost_blob)
+        )
+        compiled.logger = LoggerCustom().logger
+        compiled.logger.info(f"model compiled loaded: {path} mmap_mode={mmap_mode}")
+        return compiled
@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+from src.app.conf import Model
+from src.app.logger_custom import LoggerCustom
+from src.app.model import ModelClassification, ModelClassificationCatBoost
+from src.app.model_compiled import ModelCompiled
+
+
+class ModelRegistry:
+    """Holds one model per process and reloads it when the artifact changes.
+
+    Without an artifact on disk the rule based ModelClassification is served.
+    """
+
+    def __init__(self, conf: Model):
+        self.path = conf.path
+        self.model_class = (
+            ModelCompiled if conf.is_compiled else ModelClassificationCatBoost
+        )
+        self.reload_interval_s = conf.reload_interval_s
+        self.mmap_mode = "r" if conf.is_mmap else None
+        self.logger = LoggerCustom().logger
+        self._lock = threading.Lock()
+        self._model: Optional[ModelClassification] = None
+        self._artifact_stat: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+
+    def get(self) -> ModelClassification:
+        if self._model is None or self._is_check_due():
+            with self._lock:
+                if self._model is None or self._is_check_due():
+                    self._refresh()
+        return self._model
+
+    def _is_check_due(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.reload_interval_s
+
+    def _get_artifact_stat(self) -> Optional[Tuple[int, int]]:
+        if self.path is None or not os.path.isfile(self.path):
+            return None
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self):
+        self._checked_at = time.monotonic()
+        artifact_stat = self._get_artifact_stat()
+        if self._model is not None and artifact_stat == self._artifact_stat:
+            return
+
+        if artifact_stat is None:
+            if self._model is None:
+                self.logger.info(f"no model artifact at {self.path}, rule model")
+                self._model = ModelClassification()
+            return
+
+        try:
+            model = self.model_class.load(path=self.path, mmap_mode=self.mmap_mode)
+        except Exception as e:
+            if self._model is None:
+                raise
+            self.logger.error(f"model reload failed, keeping current model: {e}")
+            return
+
+        self._model = model
+        self._artifact_stat = artifact_stat
@@ -1,19 +1,54 @@
+from typing import List, Optional
+
+from src.app.feature_state import FeatureState
+from src.app.metrics import stage_timer
 from src.app.model import ModelClassification
 from src.app.schema_pydantic import Request, Response
 
 
 class Prediction:
-    def __init__(self, model: ModelClassification):
+    def __init__(
+        self, model: ModelClassification, feature_state: Optional[FeatureState] = None
+    ):
         self.model = model
+        self.feature_state = feature_state
 
     def predict(self, request: Request):
         transaction = request.transaction
-        is_fraud_prob = self.model.predict_proba(
-            X=self.model.get_feature_dict(transaction=transaction)
-        )
+        with stage_timer.time("get_feature_dict"):
+            X = self.model.get_feature_dict(transaction=transaction)
+        if self.feature_state is not None:
+            with stage_timer.time("feature_state"):
+                X.update(self.feature_state.get_feature_dict(transaction=transaction))
+        with stage_timer.time("predict_proba"):
+            is_fraud_prob = self.model.predict_proba(X=X)
         response = Response(
             id="some_generated_id",
             id_request=request.id,
             is_fraud_prob=is_fraud_prob,
         )
         return response
+
+    def predict_batch(self, request_list: List[Request]) -> List[Response]:
+        if not request_list:
+            return []
+        transaction_list = [request.transaction for request in request_list]
+        with stage_timer.time("get_feature_df"):
+            df = self.model.get_feature_df(transaction_list=transaction_list)
+        if self.feature_state is not None:
+            with stage_timer.time("feature_state"):
+                df = df.assign(
+                    **self.feature_state.get_feature_array_dict(
+                        transaction_list=transaction_list
+                    )
+                )
+        with stage_timer.time("predict_proba"):
+            is_fraud_prob_array = self.model.predict_proba_batch(df=df)
+        return [
+            Response(
+                id="some_generated_id",
+                id_request=request.id,
+                is_fraud_prob=is_fraud_prob,
+            )
+            for request, is_fraud_prob in zip(request_list, is_fraud_prob_array)
+        ]
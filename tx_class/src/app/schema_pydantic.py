@@ -1,10 +1,12 @@
 from pydantic import BaseModel
 
+AMOUNT_MISSING = -999999.99
+
 
 class Transaction(BaseModel):
     id: str
     dtime: str = "1970-01-01 23:59:59"
-    amount: float = -999999.99
+    amount: float = AMOUNT_MISSING
     transaction_type: str = "unknown"
     code: str = "x"
 
@@ -1,10 +1,51 @@
-from fastapi import FastAPI
+import os
+from typing import Awaitable, Callable, List
 
-from src.app.model import ModelClassification
+from fastapi import Depends, FastAPI
+from fastapi import Request as HttpRequest
+from fastapi.openapi.utils import get_openapi
+from fastapi.responses import JSONResponse
+from fastapi.responses import Response as HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from pydantic.schema import schema
+
+from src.app.codec import Codec
+from src.app.conf import CONF_DEFAULT, read_conf
+from src.app.feature_state import FeatureState
+from src.app.metrics import TimingMiddleware, stage_timer
+from src.app.model_registry import ModelRegistry
 from src.app.prediction import Prediction
 from src.app.schema_pydantic import Request, Response
+from src.app.worker_pool import OverloadError, WorkerPool
+
+conf = read_conf(env=os.environ["ENV"]) if "ENV" in os.environ else CONF_DEFAULT
+model_registry = ModelRegistry(conf=conf.model)
+codec = Codec(is_fast=conf.api.is_codec_orjson)
+worker_pool = WorkerPool(conf=conf.worker)
+feature_state = (
+    FeatureState.from_conf(conf=conf.state) if conf.state.is_enabled else None
+)
+
+stage_timer.is_enabled = conf.metrics.is_enabled
 
 app = FastAPI()
+if conf.metrics.is_enabled:
+    app.add_middleware(TimingMiddleware)
+
+
+@app.on_event("shutdown")
+def save_feature_state():
+    if feature_state is not None and conf.state.snapshot_path is not None:
+        feature_state.save(path=conf.state.snapshot_path)
+
+
+@app.exception_handler(OverloadError)
+async def handle_overload(http_request: HttpRequest, e: OverloadError):
+    return JSONResponse(
+        status_code=e.status_code,
+        content={"detail": e.detail},
+        headers={"Retry-After": "1"},
+    )
 
 
 @app.get("/status")
@@ -12,8 +53,106 @@ async def get_status():
     return {"status": "API is running"}
 
 
-@app.post("/predict", response_model=Response)
-async def predict(request: Request):
-    model = ModelClassification()
-    prediction = Prediction(model=model)
-    return prediction.predict(request=request)
+@app.get("/metrics")
+async def metrics():
+    return HttpResponse(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+def observe_request_parsing(http_request: HttpRequest):
+    time_start = getattr(http_request.state, "time_start", None)
+    if time_start is not None:
+        stage_timer.observe_since(stage="request_parsing", time_start=time_start)
+
+
+# the bodies are parsed by codec from the raw bytes, their schema is declared
+# here for the openapi document
+SCHEMA_REF_PREFIX = "#/components/schemas/"
+REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "application/json": {"schema": {"$ref": f"{SCHEMA_REF_PREFIX}Request"}}
+    },
+}
+REQUEST_LIST_BODY = {
+    "required": True,
+    "content": {
+        "application/json": {
+            "schema": {
+                "title": "Request List",
+                "type": "array",
+                "items": {"$ref": f"{SCHEMA_REF_PREFIX}Request"},
+            }
+        }
+    },
+}
+
+
+def openapi() -> dict:
+    if app.openapi_schema is None:
+        openapi_schema = get_openapi(
+            title=app.title,
+            version=app.version,
+            openapi_version=app.openapi_version,
+            description=app.description,
+            routes=app.routes,
+        )
+        openapi_schema.setdefault("components", {}).setdefault("schemas", {}).update(
+            schema([Request], ref_prefix=SCHEMA_REF_PREFIX)["definitions"]
+        )
+        app.openapi_schema = openapi_schema
+    return app.openapi_schema
+
+
+app.openapi = openapi
+
+
+async def get_request(http_request: HttpRequest) -> Request:
+    return codec.parse_request(body=await http_request.body())
+
+
+async def get_request_list(http_request: HttpRequest) -> List[Request]:
+    return codec.parse_request_list(body=await http_request.body())
+
+
+async def predict_direct(request: Request) -> Response:
+    prediction = Prediction(model=model_registry.get(), feature_state=feature_state)
+    return await worker_pool.run(fn=prediction.predict, request=request)
+
+
+PredictHandler = Callable[[Request], Awaitable[Response]]
+
+
+# a ray serve replica sets app.state.predict_handler to its micro-batching handler
+def get_predict_handler(http_request: HttpRequest) -> PredictHandler:
+    return getattr(http_request.app.state, "predict_handler", predict_direct)
+
+
+@app.post(
+    "/predict", response_model=Response, openapi_extra={"requestBody": REQUEST_BODY}
+)
+async def predict(
+    http_request: HttpRequest,
+    request: Request = Depends(get_request),
+    predict_handler: PredictHandler = Depends(get_predict_handler),
+):
+    observe_request_parsing(http_request=http_request)
+    response = await predict_handler(request)
+    with stage_timer.time("response_serialization"):
+        return codec.render(content=response.dict())
+
+
+@app.post(
+    "/predict_batch",
+    response_model=List[Response],
+    openapi_extra={"requestBody": REQUEST_LIST_BODY},
+)
+async def predict_batch(
+    http_request: HttpRequest, request_list: List[Request] = Depends(get_request_list)
+):
+    observe_request_parsing(http_request=http_request)
+    prediction = Prediction(model=model_registry.get(), feature_state=feature_state)
+    response_list = await worker_pool.run(
+        fn=prediction.predict_batch, request_list=request_list
+    )
+    with stage_timer.time("response_serialization"):
+        return codec.render(content=[response.dict() for response in response_list])
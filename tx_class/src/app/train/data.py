@@ -1,32 +1,80 @@
 import random
 import uuid
 from datetime import datetime, timedelta
+from typing import Callable, Iterator, Optional
 
+import numpy as np
+import pandas as pd
+import pyarrow.dataset
 from pyspark import RDD
-from pyspark.sql import DataFrame, SparkSession
-from pyspark.sql.functions import col, concat, lit, to_date
+from pyspark.sql import DataFrame, SparkSession, Window
+from pyspark.sql.functions import (
+    coalesce,
+    col,
+    concat,
+    count,
+    datediff,
+    dayofweek,
+    length,
+    lit,
+    substring,
+    to_date,
+    when,
+)
+from pyspark.sql.functions import max as max_
+from pyspark.sql.functions import sum as sum_
+from pyspark.sql.types import (
+    DoubleType,
+    LongType,
+    StringType,
+    StructField,
+    StructType,
+)
 
+from src.app.conf import State
 from src.app.date_time import DateTime
+from src.app.feature_state import SINCE_LAST_MISSING, get_feature_name_list
 from src.app.model import ModelClassification
-from src.app.schema_pydantic import TransactionLabeled
+from src.app.schema_pydantic import AMOUNT_MISSING, TransactionLabeled
+
+FRAUD_RATE = 0.1
+AMOUNT_MIN = 10.0
+AMOUNT_MAX = 1000.0
+TRANSACTION_TYPE_LIST = ["credit", "debit"]
+CODE_LIST = ["ab1", "ab2", "ac1", "ba1"]
+DT_MIN = datetime(2023, 12, 1)
+DT_MAX = datetime(2024, 2, 1)
+
+COL_DATE = "date"
+
+TRANSACTION_SCHEMA = StructType(
+    [
+        StructField("id", StringType()),
+        StructField("dtime", StringType()),
+        StructField("amount", DoubleType()),
+        StructField("transaction_type", StringType()),
+        StructField("code", StringType()),
+        StructField("is_fraud", LongType()),
+    ]
+)
 
 
 class TransactionRandom(TransactionLabeled):
     def __init__(self):
         super().__init__(
             id=uuid.uuid4().hex,
-            is_fraud=int(random.random() < 0.1),
-            amount=round(random.uniform(10.0, 1000.0), 2),
-            transaction_type=random.choice(["credit", "debit"]),
-            code=random.choice(["ab1", "ab2", "ac1", "ba1"]),
+            is_fraud=int(random.random() < FRAUD_RATE),
+            amount=round(random.uniform(AMOUNT_MIN, AMOUNT_MAX), 2),
+            transaction_type=random.choice(TRANSACTION_TYPE_LIST),
+            code=random.choice(CODE_LIST),
             dtime=self.get_dtime_random(),
         )
 
     def get_dtime_random(
         self,
     ) -> str:
-        dt_min = datetime(2023, 12, 1)
-        dt_max = datetime(2024, 2, 1)
+        dt_min = DT_MIN
+        dt_max = DT_MAX
 
         delta = dt_max - dt_min
         dt_obj = dt_min + timedelta(
@@ -35,6 +83,55 @@ class TransactionRandom(TransactionLabeled):
         return DateTime().get_str(dt_obj=dt_obj)
 
 
+def get_transaction_df_random(count: int, seed) -> pd.DataFrame:
+    """TransactionRandom columns for count rows at once, from a numpy rng."""
+    rng = np.random.default_rng(seed)
+    second_max = int((DT_MAX - DT_MIN).total_seconds())
+    dtime = np.datetime64(DT_MIN, "s") + rng.integers(
+        0, second_max, size=count, endpoint=True
+    )
+    return pd.DataFrame(
+        {
+            "id": np.frombuffer(rng.bytes(16 * count).hex().encode(), dtype="S32")
+            .astype(str)
+            .astype(object),
+            "dtime": np.char.replace(
+                np.datetime_as_string(dtime, unit="s"), "T", " "
+            ).astype(object),
+            "amount": np.round(rng.uniform(AMOUNT_MIN, AMOUNT_MAX, size=count), 2),
+            "transaction_type": rng.choice(TRANSACTION_TYPE_LIST, size=count).astype(
+                object
+            ),
+            "code": rng.choice(CODE_LIST, size=count).astype(object),
+            "is_fraud": (rng.random(size=count) < FRAUD_RATE).astype(np.int64),
+        },
+        columns=TRANSACTION_SCHEMA.names,
+    )
+
+
+def get_df_random(count: int, seed: Optional[int] = None) -> pd.DataFrame:
+    """Feature frame of count random transactions, reproducible with a seed."""
+    if seed is None:
+        transaction_list = [TransactionRandom() for _ in range(count)]
+    else:
+        transaction_list = [
+            TransactionLabeled(**record)
+            for record in get_transaction_df_random(count=count, seed=seed).to_dict(
+                "records"
+            )
+        ]
+    df = ModelClassification().get_feature_df(transaction_list=transaction_list)
+    df["is_fraud"] = [t.is_fraud for t in transaction_list]
+    return df
+
+
+def iter_parquet_batch(path: str, batch_size: int) -> Iterator[pd.DataFrame]:
+    dataset = pyarrow.dataset.dataset(path, format="parquet")
+    for batch in dataset.to_batches(batch_size=batch_size):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
 class Data:
     def __init__(self, spark: SparkSession):
         self.spark = spark
@@ -50,28 +147,182 @@ class Data:
             lambda _: TransactionRandom()
         )
 
+    def build_random_df(
+        self, count: int, partition_count: int, seed: int = 0
+    ) -> DataFrame:
+        """Spark DataFrame of random transactions, generated per partition.
+
+        Each partition draws its rows with a numpy rng seeded by
+        (seed, partition index), no pydantic model is built per row.
+        """
+
+        def get_row_iter(index, _):
+            count_partition = count // partition_count + (
+                index < count % partition_count
+            )
+            df = get_transaction_df_random(count=count_partition, seed=[seed, index])
+            return zip(*(df[name].tolist() for name in TRANSACTION_SCHEMA.names))
+
+        rdd = self.spark.sparkContext.parallelize(
+            range(partition_count), partition_count
+        ).mapPartitionsWithIndex(get_row_iter)
+        return self.spark.createDataFrame(rdd, schema=TRANSACTION_SCHEMA)
+
+    def build_random_parquet(
+        self, count: int, path: str, partition_count: int, seed: int = 0
+    ):
+        self.write_parquet(
+            df=self.build_random_df(
+                count=count, partition_count=partition_count, seed=seed
+            ),
+            path=path,
+            mode="overwrite",
+        )
+
+    @staticmethod
+    def write_parquet(df: DataFrame, path: str, mode: str = None):
+        """Parquet partitioned by transaction date, date=yyyy-MM-dd folders."""
+        df.withColumn(COL_DATE, to_date(substring("dtime", 1, 10))).write.parquet(
+            path=path, mode=mode, partitionBy=COL_DATE
+        )
+
     def save(self, path: str):
-        self.transaction_rdd.map(lambda t: t.dict()).toDF().write.parquet(path=path)
+        self.write_parquet(df=self.get_transaction_df(), path=path)
 
     def load(self, path: str):
         self.transaction_rdd = self.spark.read.parquet(path)
 
-    def get_df(self, model: ModelClassification):
-        self.df = self.transaction_rdd.map(
+    def get_transaction_df(self) -> DataFrame:
+        if isinstance(self.transaction_rdd, DataFrame):
+            return self.transaction_rdd
+        return self.spark.createDataFrame(
+            self.transaction_rdd.map(
+                lambda t: tuple(t.dict()[name] for name in TRANSACTION_SCHEMA.names)
+            ),
+            schema=TRANSACTION_SCHEMA,
+        )
+
+    def get_df(self, state_conf: Optional[State] = None):
+        """ModelClassification.get_feature_and_label_dict as column expressions.
+
+        dtime has the fixed DateTime format, so its fields are read by position
+        and no timestamp (nor session time zone) is involved. With state_conf
+        the FeatureState columns are added, see get_state_column_dict.
+        """
+        df = self.get_transaction_df()
+        if COL_DATE not in df.columns:
+            df = df.withColumn(COL_DATE, to_date(substring("dtime", 1, 10)))
+        code_width = df.select(max_(length("code"))).first()[0] or 0
+
+        dtime = col("dtime")
+        column_dict = {
+            "amount": col("amount"),
+            "transaction_type": col("transaction_type"),
+            "dt_year": substring(dtime, 1, 4).cast("long"),
+            "dt_month": substring(dtime, 6, 2).cast("long"),
+            "dt_day": substring(dtime, 9, 2).cast("long"),
+            # spark sunday=1, datetime.weekday() monday=0
+            "dt_weekday": ((dayofweek(to_date(substring(dtime, 1, 10))) + 5) % 7).cast(
+                "long"
+            ),
+            "dt_hour": substring(dtime, 12, 2).cast("long"),
+            "is_fraud": col("is_fraud"),
+            # kept as is so split filters prune the parquet date partitions
+            COL_DATE: col(COL_DATE),
+            **{
+                f"code_{i}": when(length("code") > i, substring("code", i + 1, 1))
+                for i in range(code_width)
+            },
+        }
+        if state_conf is not None:
+            column_dict.update(self.get_state_column_dict(state_conf=state_conf))
+        self.df = df.select(
+            [column_dict[name].alias(name) for name in sorted(column_dict)]
+        )
+
+    @staticmethod
+    def get_state_column_dict(state_conf: State):
+        """FeatureState features as window frames over the key, in batch.
+
+        The frames end one second before each transaction, as FeatureState
+        only counts the earlier transactions of the key. Missing amounts are
+        null, out of the amount sums.
+        """
+        dtime = col("dtime")
+        time_s = (
+            datediff(to_date(substring(dtime, 1, 10)), lit("1970-01-01")).cast("long")
+            * 86400
+            + substring(dtime, 12, 2).cast("long") * 3600
+            + substring(dtime, 15, 2).cast("long") * 60
+            + substring(dtime, 18, 2).cast("long")
+        )
+        window = Window.partitionBy(state_conf.key).orderBy(time_s)
+        amount = when(col("amount") != lit(AMOUNT_MISSING), col("amount"))
+        window_s_list = sorted(state_conf.window_s_list)
+
+        column_list = [
+            *(
+                count(lit(1)).over(window.rangeBetween(-window_s, -1)).cast("double")
+                for window_s in window_s_list
+            ),
+            *(
+                coalesce(
+                    sum_(amount).over(window.rangeBetween(-window_s, -1)),
+                    lit(0.0),
+                )
+                for window_s in window_s_list
+            ),
+            coalesce(
+                (
+                    time_s
+                    - max_(time_s).over(window.rangeBetween(-state_conf.ttl_s, -1))
+                ).cast("double"),
+                lit(SINCE_LAST_MISSING),
+            ),
+        ]
+        return dict(
+            zip(get_feature_name_list(window_s_list=window_s_list), column_list)
+        )
+
+    def get_df_python(self, model: ModelClassification):
+        transaction_rdd = self.transaction_rdd
+        if isinstance(transaction_rdd, DataFrame):
+            transaction_rdd = transaction_rdd.rdd.map(
+                lambda row: TransactionLabeled(**row.asDict())
+            )
+        self.df = transaction_rdd.map(
             lambda t: model.get_feature_and_label_dict(transaction=t)
         ).toDF()
 
+    def get_batch_iter(
+        self, df: DataFrame, path: str, batch_size: int = 100_000
+    ) -> Callable[[], Iterator[pd.DataFrame]]:
+        """Hand df to pandas in arrow batches through parquet, not toPandas.
+
+        Each call of the returned function starts a new pass over the batches,
+        only one batch is in driver memory at a time.
+        """
+        df.write.parquet(path=path, mode="overwrite")
+        return lambda: iter_parquet_batch(path=path, batch_size=batch_size)
+
     def split(self, test_min_dtime: str):
-        col_date = "date"
-        df = self.df.withColumn(
-            colName=col_date,
-            col=to_date(
-                concat(
-                    col("dt_year"), lit("-"), col("dt_month"), lit("-"), col("dt_day")
+        col_date = COL_DATE
+        df = self.df
+        if col_date not in df.columns:
+            df = df.withColumn(
+                colName=col_date,
+                col=to_date(
+                    concat(
+                        col("dt_year"),
+                        lit("-"),
+                        col("dt_month"),
+                        lit("-"),
+                        col("dt_day"),
+                    ),
+                    "yyyy-MM-dd",
                 ),
-                "yyyy-MM-dd",
-            ),
-        )
+            )
+        date_min = to_date(lit(test_min_dtime))
 
-        self.df_train = df.filter(col(col_date) < lit(test_min_dtime)).drop(col_date)
-        self.df_test = df.filter(col(col_date) >= lit(test_min_dtime)).drop(col_date)
+        self.df_train = df.filter(col(col_date) < date_min).drop(col_date)
+        self.df_test = df.filter(col(col_date) >= date_min).drop(col_date)
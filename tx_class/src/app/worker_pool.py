@@ -0,0 +1,73 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from prometheus_client import Gauge
+
+from src.app.conf import Worker
+from src.app.logger_custom import LoggerCustom
+
+T = TypeVar("T")
+
+QUEUE_DEPTH = Gauge(
+    "tx_class_worker_queue_depth", "Scoring calls waiting for a worker thread"
+)
+IN_FLIGHT = Gauge("tx_class_worker_in_flight", "Scoring calls running on a worker")
+
+
+class OverloadError(Exception):
+    """Scoring call refused, status_code 429 when the queue is full and 503
+    as soon as it has waited for a worker longer than the queue timeout."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class WorkerPool:
+    """Bounded thread pool running the scoring off the event loop.
+
+    Threads rather than processes: CatBoost and numpy release the GIL, and the
+    registry model is shared without pickling. At most worker_count calls run
+    and max_queue_size wait, further calls fail fast instead of queueing.
+    """
+
+    def __init__(self, conf: Worker):
+        self.conf = conf
+        self.executor = ThreadPoolExecutor(
+            max_workers=conf.worker_count, thread_name_prefix="tx_class_worker"
+        )
+        # only read and written on the event loop thread
+        self.pending_count = 0
+        self.logger = LoggerCustom().logger
+
+    def _run_worker(self, fn: Callable[..., T], kwargs) -> T:
+        QUEUE_DEPTH.dec()
+        with IN_FLIGHT.track_inprogress():
+            return fn(**kwargs)
+
+    async def run(self, fn: Callable[..., T], **kwargs) -> T:
+        if self.pending_count >= self.conf.worker_count + self.conf.max_queue_size:
+            self.logger.warning(f"worker queue full: {self.pending_count}")
+            raise OverloadError(status_code=429, detail="worker queue full")
+
+        self.pending_count += 1
+        QUEUE_DEPTH.inc()
+        future = self.executor.submit(self._run_worker, fn, kwargs)
+        future_async = asyncio.wrap_future(future)
+        try:
+            # the timeout bounds the wait for a worker, not the scoring
+            done, _ = await asyncio.wait(
+                {future_async}, timeout=self.conf.queue_timeout_s
+            )
+            if not done and future.cancel():
+                self.logger.warning(f"worker queue timeout: {self.pending_count}")
+                raise OverloadError(status_code=503, detail="worker queue timeout")
+            return await future_async
+        finally:
+            self.pending_count -= 1
+            # cancelled while queued, on timeout or with the request, it never
+            # reaches _run_worker
+            if future.cancel():
+                QUEUE_DEPTH.dec()
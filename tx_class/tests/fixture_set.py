@@ -1,6 +1,8 @@
 import pytest
 from pyspark.sql import SparkSession
 from src.app.conf import read_conf
+from src.app.model import ModelClassificationCatBoost
+from src.app.train.data import get_df_random
 
 
 @pytest.fixture(scope="module")
@@ -11,3 +13,12 @@ def conf():
 @pytest.fixture(scope="module")
 def spark():
     return SparkSession.builder.master("local[1]").appName("pytest").getOrCreate()
+
+
+@pytest.fixture(scope="module")
+def model_catboost():
+    model = ModelClassificationCatBoost()
+    model.train_and_evaluate(
+        df_train=get_df_random(count=100), df_test=get_df_random(count=50)
+    )
+    return model
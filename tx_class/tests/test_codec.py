@@ -0,0 +1,57 @@
+import json
+
+import pytest
+from fastapi.exceptions import RequestValidationError
+from src.app.codec import Codec, ValidatorFast
+from src.app.schema_pydantic import Request
+
+REQUEST_LIST = [
+    {"id": "id_0", "transaction": {"id": "id_0"}},
+    {
+        "id": "id_1",
+        "transaction": {
+            "id": "id_1",
+            "dtime": "2024-01-01 10:00:00",
+            "amount": 1500,
+            "transaction_type": "credit",
+            "code": "ab1",
+            "unknown": 1,
+        },
+    },
+    {"id": "id_2", "transaction": {"id": "id_2", "amount": "12.5"}},
+]
+
+
+@pytest.mark.parametrize("obj", REQUEST_LIST)
+def test_parse_request_parity(obj):
+    body = json.dumps(obj).encode()
+    request = Codec(is_fast=True).parse_request(body=body)
+
+    assert request == Codec().parse_request(body=body) == Request.parse_obj(obj)
+    assert request.transaction.__fields_set__ == (
+        Request.parse_obj(obj).transaction.__fields_set__
+    )
+
+
+def test_validator_fast_fallback():
+    validator = ValidatorFast(model=Request)
+
+    assert validator.validate(obj=REQUEST_LIST[0]) is not None
+    assert validator.validate(obj=REQUEST_LIST[2]) is None
+    assert validator.validate(obj={"transaction": {"id": "id_0"}}) is None
+    assert validator.validate(obj=[]) is None
+
+
+@pytest.mark.parametrize("is_fast", [False, True])
+def test_parse_request_list(is_fast):
+    codec = Codec(is_fast=is_fast)
+
+    request_list = codec.parse_request_list(body=json.dumps(REQUEST_LIST).encode())
+    assert request_list == [Request.parse_obj(obj) for obj in REQUEST_LIST]
+
+    with pytest.raises(RequestValidationError) as e:
+        codec.parse_request_list(body=json.dumps([{"id": "id_0"}]).encode())
+    assert e.value.errors()[0]["loc"] == ("body", 0, "transaction")
+
+    with pytest.raises(RequestValidationError):
+        codec.parse_request(body=b"{")
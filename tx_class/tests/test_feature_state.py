@@ -0,0 +1,143 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+from src.app.conf import State
+from src.app.feature_state import FeatureState
+from src.app.schema_pydantic import AMOUNT_MISSING, Transaction
+
+STATE_CONF = State(is_enabled=True, window_s_list=[600, 60], ttl_s=1800)
+
+
+def get_transaction_list(count: int, seed: int = 0):
+    """Time ordered transactions, a few within the same second or no amount."""
+    rng = random.Random(seed)
+    time_s = 1_700_000_000
+    transaction_list = []
+    for i in range(count):
+        time_s += rng.choice([0, 1, 5, 30, 200, 2000])
+        amount = round(rng.uniform(10, 100), 2)
+        transaction_list.append(
+            Transaction(
+                id=str(i),
+                dtime=str(np.datetime64(time_s, "s")).replace("T", " "),
+                amount=AMOUNT_MISSING if i % 10 == 0 else amount,
+                code=rng.choice(["ab1", "ab2", "ac1"]),
+            )
+        )
+    return transaction_list
+
+
+def get_feature_df_reference(transaction_list, conf: State) -> pd.DataFrame:
+    """Brute force over all the earlier transactions of the key."""
+    df = pd.DataFrame([t.dict() for t in transaction_list])
+    df["time_s"] = np.array(df["dtime"], dtype="datetime64[s]").astype(np.int64)
+    row_list = []
+    for row in df.itertuples():
+        df_key = df[(df["code"] == row.code) & (df["time_s"] < row.time_s)]
+        feature_dict = {}
+        for window_s in conf.window_s_list:
+            df_window = df_key[df_key["time_s"] >= row.time_s - window_s]
+            feature_dict[f"state_count_{window_s}s"] = float(len(df_window))
+            feature_dict[f"state_amount_{window_s}s"] = df_window["amount"][
+                df_window["amount"] != AMOUNT_MISSING
+            ].sum()
+        since_last = row.time_s - df_key["time_s"].max() if len(df_key) else None
+        feature_dict["state_since_last_s"] = (
+            float(since_last)
+            if since_last is not None and since_last <= conf.ttl_s
+            else -1.0
+        )
+        row_list.append(feature_dict)
+    return pd.DataFrame(row_list)
+
+
+def test_feature_state_reference():
+    transaction_list = get_transaction_list(count=300)
+    feature_state = FeatureState(conf=STATE_CONF)
+
+    df = pd.DataFrame(
+        [feature_state.get_feature_dict(transaction=t) for t in transaction_list]
+    )
+
+    df_reference = get_feature_df_reference(
+        transaction_list=transaction_list, conf=STATE_CONF
+    )
+    pd.testing.assert_frame_equal(df[df_reference.columns], df_reference)
+
+
+def test_feature_state_empty_window():
+    feature_state = FeatureState(conf=STATE_CONF)
+    time_s_list = [0, 1, 2, 3, 3, 100, 100, 100, 1000]
+
+    feature_dict_list = [
+        feature_state.get_feature_dict(
+            transaction=Transaction(
+                id=str(i),
+                dtime=str(np.datetime64(1_700_000_000 + time_s, "s")).replace("T", " "),
+                amount=[0.1, 0.2, 0.7][i % 3],
+            )
+        )
+        for i, time_s in enumerate(time_s_list)
+    ]
+
+    # no float residue of the running sums in an empty window
+    assert [d["state_amount_60s"] for d in feature_dict_list[4:]] == [
+        pytest.approx(1.0),
+        0.0,
+        0.0,
+        0.0,
+        0.0,
+    ]
+    assert feature_dict_list[5]["state_amount_600s"] == pytest.approx(1.3)
+    assert feature_dict_list[-1]["state_amount_600s"] == 0.0
+
+
+def test_feature_state_array_dict():
+    transaction_list = get_transaction_list(count=100)
+    feature_state = FeatureState(conf=STATE_CONF)
+    feature_state_batch = FeatureState(conf=STATE_CONF)
+
+    df = pd.DataFrame(
+        [feature_state.get_feature_dict(transaction=t) for t in transaction_list]
+    )
+    df_batch = pd.DataFrame(
+        feature_state_batch.get_feature_array_dict(transaction_list=transaction_list)
+    )
+
+    pd.testing.assert_frame_equal(df_batch, df)
+
+
+def test_feature_state_ttl_and_snapshot(tmp_path):
+    transaction_list = get_transaction_list(count=100)
+    feature_state = FeatureState(conf=STATE_CONF)
+    feature_state.get_feature_array_dict(transaction_list=transaction_list[:50])
+
+    time_clock = feature_state.time_clock
+    assert all(
+        key_state.time_last >= time_clock - STATE_CONF.ttl_s
+        for key_state in feature_state.state_dict.values()
+    )
+
+    path = str(tmp_path / "feature_state.joblib")
+    feature_state.save(path=path)
+    feature_state_loaded = FeatureState.from_conf(
+        conf=State(**{**STATE_CONF.dict(), "snapshot_path": path})
+    )
+
+    pd.testing.assert_frame_equal(
+        pd.DataFrame(
+            feature_state_loaded.get_feature_array_dict(
+                transaction_list=transaction_list[50:]
+            )
+        ),
+        pd.DataFrame(
+            feature_state.get_feature_array_dict(transaction_list=transaction_list[50:])
+        ),
+    )
+
+
+def test_feature_state_ttl_below_window():
+    with pytest.raises(ValueError):
+        FeatureState(conf=State(window_s_list=[3600], ttl_s=60))
@@ -1,8 +1,23 @@
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
 import pytest
-from src.app.model import ModelClassification, ModelClassificationCatBoost
+from scipy.sparse import csr_matrix
+from src.app.date_time import DateTime
+from src.app.model import (
+    LDATransformer,
+    ModelClassification,
+    ModelClassificationCatBoost,
+    Schema,
+    TokenCountTransformer,
+    TokenizerTransformer,
+)
 from src.app.schema_pydantic import Transaction
 from src.app.train.data import Data
-from tests.fixture_set import spark
+from tests.fixture_set import get_df_random, model_catboost, spark
 
 
 def test_basic():
@@ -30,12 +45,170 @@ def test_basic():
     assert model.predict_proba(X=feature_dict) == 0.1
 
 
+def test_get_feature_df():
+    transaction_list = [
+        Transaction(id="id_1", amount=10, transaction_type="credit", code="a43"),
+        Transaction(
+            id="id_2",
+            dtime="2024-01-15 08:30:00",
+            amount=1500,
+            transaction_type="debit",
+            code="b12",
+        ),
+        Transaction(id="id_3", dtime="2024-02-29 00:00:01", code="ba1"),
+        Transaction(id="id_4", dtime="1969-12-31 12:00:00", code="ab2"),
+    ]
+    model = ModelClassification()
+
+    df = model.get_feature_df(transaction_list=transaction_list)
+
+    assert df.to_dict(orient="records") == [
+        model.get_feature_dict(transaction=t) for t in transaction_list
+    ]
+    assert list(model.predict_proba_batch(df=df)) == [0.1, 0.9, 0.1, 0.1]
+
+
+def test_parse_code_array():
+    code_dict = ModelClassification.parse_code_array(code_list=["a43", "x"])
+
+    assert list(code_dict["code_0"]) == ["a", "x"]
+    assert list(code_dict["code_1"]) == ["4", None]
+    assert list(code_dict["code_2"]) == ["3", None]
+
+
+@pytest.mark.parametrize("code_list", [["a43", "x"], [""], ["", "ab"]])
+def test_parse_code_parity(code_list):
+    code_dict = ModelClassification.parse_code_array(code_list=code_list)
+    dict_list = [ModelClassification.parse_code(code=code) for code in code_list]
+
+    assert sorted(code_dict) == sorted(set().union(*dict_list))
+    for i, d in enumerate(dict_list):
+        assert {k: v[i] for k, v in code_dict.items() if v[i] is not None} == d
+
+
+@pytest.mark.parametrize(
+    "dtime", ["2024-01-15", "2024-01-15T08:30:00", "2024-1-5 08:30:00", ""]
+)
+def test_get_feature_dtime_parity(dtime):
+    transaction = Transaction(id="id_1", dtime=dtime)
+    model = ModelClassification()
+
+    with pytest.raises(ValueError, match="does not match format"):
+        model.get_feature_dict(transaction=transaction)
+    with pytest.raises(ValueError, match="does not match format"):
+        model.get_feature_df(transaction_list=[transaction])
+
+
+def test_date_time_get_obj_unpadded():
+    # the strict format is for the feature paths only, get_obj stays strptime
+    assert DateTime().get_obj(dt_str="2024-1-5 3:04:05") == datetime(
+        2024, 1, 5, 3, 4, 5
+    )
+
+
+def test_tokenizer_transformer():
+    X = pd.DataFrame({"code_0": ["a", "b"], "transaction_type": ["credit", "debit"]})
+    transformer = TokenizerTransformer(cat_cols=list(X.columns), col_token="token")
+
+    assert list(transformer.fit_transform(X=X)) == [
+        "code_0|a transaction_type|credit",
+        "code_0|b transaction_type|debit",
+    ]
+
+
+def test_token_count_transformer():
+    X_train = pd.DataFrame({"code_0": ["a", "b", "a"], "code_1": ["1", "1", "2"]})
+    X = pd.DataFrame({"code_0": ["a", "z"], "code_1": ["2", "1"]})
+    transformer = TokenCountTransformer(cat_cols=list(X.columns), min_df=2)
+
+    count_matrix = transformer.fit(X=X_train).transform(X=X)
+
+    assert transformer.feature_names_ == ["code_0|a", "code_1|1"]
+    assert count_matrix.toarray().tolist() == [[1, 0], [0, 1]]
+
+
+def test_lda_transformer_cache():
+    X = np.array([[1, 0, 1], [0, 1, 1], [1, 0, 1], [1, 1, 0]] * 5)
+    transformer = LDATransformer(n_components=2, cache_size=2).fit(X=X)
+
+    lda_features = transformer.transform(X=X)
+
+    np.testing.assert_allclose(lda_features, transformer.lda_model.transform(X))
+    assert transformer.get_cache_info() == {
+        "hit_count": 0,
+        "miss_count": 3,
+        "size": 2,
+        "max_size": 2,
+    }
+
+    np.testing.assert_allclose(transformer.transform(X=X[:2]), lda_features[:2])
+    assert transformer.get_cache_info()["hit_count"] == 1
+
+    # sparse rows, keyed without densifying
+    np.testing.assert_allclose(
+        transformer.transform(X=csr_matrix(X[:2])), lda_features[:2]
+    )
+    assert transformer.get_cache_info()["hit_count"] == 3
+
+
+def test_lda_transformer_fit_transform():
+    X = csr_matrix(np.array([[1, 0, 1], [0, 1, 1], [1, 0, 1], [1, 1, 0]] * 5))
+    transformer = LDATransformer(n_components=2, cache_size=2)
+
+    lda_features = transformer.fit_transform(X=X)
+
+    np.testing.assert_allclose(lda_features, transformer.lda_model.transform(X))
+    assert transformer.get_cache_info() == {
+        "hit_count": 0,
+        "miss_count": 0,
+        "size": 0,
+        "max_size": 2,
+    }
+
+
+def test_lda_transformer_cache_concurrent():
+    X = np.eye(8, dtype=np.int64)[np.arange(400) % 8]
+    transformer = LDATransformer(n_components=2, cache_size=2).fit(X=X)
+    lda_features = transformer.lda_model.transform(X)
+
+    def transform(i: int) -> np.ndarray:
+        return transformer.transform(X=X[i : i + 3])
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        result_list = list(executor.map(transform, range(len(X) - 3)))
+
+    for i, result in enumerate(result_list):
+        np.testing.assert_allclose(result, lda_features[i : i + 3])
+    cache_info = transformer.get_cache_info()
+    assert cache_info["size"] == 2
+    assert cache_info["hit_count"] + cache_info["miss_count"] == 3 * len(result_list)
+
+    transformer_copy = pickle.loads(pickle.dumps(transformer))
+    np.testing.assert_allclose(transformer_copy.transform(X=X[:3]), lda_features[:3])
+    np.testing.assert_allclose(transformer.transform(X=X[:3]), lda_features[:3])
+
+
+def test_prepare_df():
+    df = get_df_random(count=10)
+    df.loc[0, "amount"] = None
+    df_raw = df.copy()
+    model = ModelClassificationCatBoost()
+    model.schema = Schema(df=df)
+
+    df_prepared = model.prepare_df(df=df)
+
+    assert df.equals(df_raw)
+    assert model.prepare_df(df=df_prepared) is df_prepared
+    assert (df_prepared.dtypes[model.schema.x_cat] == "category").all()
+    assert df_prepared.loc[0, "amount"] == -999999.9
+
+
 def test_model_train_and_evaluate(spark):
     count = 100
 
     data = Data(spark=spark)
     data.build_random(count=count)
-    data.get_df(model=ModelClassification())
+    data.get_df()
     data.df.show()
 
     data.split(test_min_dtime="2024-01-01")
@@ -60,3 +233,112 @@ def test_model_train_and_evaluate(spark):
         "topic_2",
     }
     assert sum(model_card.feat_importance.values()) == pytest.approx(1)
+
+
+@pytest.mark.parametrize("search", ["random", "halving"])
+def test_model_train_and_evaluate_search(search):
+    model = ModelClassificationCatBoost(search=search, search_n_iter=2)
+    model_card = model.train_and_evaluate(
+        df_train=get_df_random(count=100), df_test=get_df_random(count=50)
+    )
+
+    assert model_card.evaluation_dict["train_cv"].log_loss > 0
+    assert model.pipeline.memory is None
+
+
+def test_model_train_and_evaluate_stream():
+    df_train_list = [get_df_random(count=60) for _ in range(3)]
+    df_test = get_df_random(count=50)
+
+    model = ModelClassificationCatBoost()
+    model_card = model.train_and_evaluate_stream(
+        batch_iter_train=lambda: (df.copy() for df in df_train_list),
+        batch_iter_test=lambda: iter([df_test.copy()]),
+        sample_count=100,
+    )
+
+    assert model_card.evaluation_dict["train"].count == 180
+    assert model_card.evaluation_dict["test"].count == 50
+    assert sum(model_card.feat_importance.values()) == pytest.approx(1)
+
+
+def test_get_sample():
+    df = pd.DataFrame({"i": np.arange(1000)})
+    df_batch_list = [df.iloc[i : i + 100] for i in range(0, 1000, 100)]
+
+    df_sample = ModelClassificationCatBoost.get_sample(
+        batch_iter=lambda: iter(df_batch_list), count=200
+    )
+
+    assert len(df_sample) == 200
+    assert df_sample["i"].is_unique and df_sample["i"].is_monotonic_increasing
+    # spread over all the batches, not the first ones
+    assert df_sample["i"].floordiv(100).nunique() == 10
+    pd.testing.assert_frame_equal(
+        df_sample,
+        ModelClassificationCatBoost.get_sample(
+            batch_iter=lambda: iter(df_batch_list), count=200
+        ),
+    )
+    df_sample_all = ModelClassificationCatBoost.get_sample(
+        batch_iter=lambda: iter(df_batch_list), count=2000
+    )
+    pd.testing.assert_frame_equal(df_sample_all, df)
+
+
+def test_get_prob_staged(model_catboost):
+    df = get_df_random(count=50)
+    X = model_catboost.prepare_df(df=df)[model_catboost.schema.x]
+
+    prob_staged = model_catboost.get_prob_staged(X=X, pipeline=model_catboost.pipeline)
+
+    np.testing.assert_allclose(
+        prob_staged, model_catboost.get_prob(df=df, pipeline=model_catboost.pipeline)
+    )
+
+
+def test_predict_proba_short_code(model_catboost):
+    transaction_list = [
+        Transaction(id="id_1", amount=10, transaction_type="credit"),
+        Transaction(id="id_2", amount=10, transaction_type="credit", code="xyz"),
+    ]
+    feature_dict = model_catboost.get_feature_dict(transaction=transaction_list[0])
+    df = model_catboost.get_feature_df(transaction_list=transaction_list[:1])
+
+    assert "code_1" not in feature_dict and "code_1" not in df.columns
+    prob = model_catboost.predict_proba(X=feature_dict)
+    assert model_catboost.predict_proba_batch(df=df)[0] == pytest.approx(prob)
+    # missing code chars score as the unknown category
+    prob_batch = model_catboost.predict_proba_batch(
+        df=model_catboost.get_feature_df(transaction_list=transaction_list)
+    )
+    assert prob_batch[0] == pytest.approx(prob)
+
+
+def test_model_train_and_evaluate_incremental(tmp_path):
+    path = str(tmp_path / "model.joblib")
+    model = ModelClassificationCatBoost()
+    model.train_and_evaluate(
+        df_train=get_df_random(count=100), df_test=get_df_random(count=50)
+    )
+    model.save(path=path)
+    tree_count = model.pipeline.named_steps["cat_boost_classifier"].tree_count_
+
+    model = ModelClassificationCatBoost.load(path=path)
+    df_train, df_test = get_df_random(count=100), get_df_random(count=50)
+    model_card = model.train_and_evaluate_incremental(
+        df_train=df_train, df_test=df_test, iterations=5, log_loss_tolerance=1.0
+    )
+
+    assert model_card.incremental_update == {"iterations": 5, "is_update": True}
+    assert model.pipeline.named_steps["cat_boost_classifier"].tree_count_ == (
+        tree_count + 5
+    )
+
+    model_card = model.train_and_evaluate_incremental(
+        df_train=df_train, df_test=df_test, iterations=5, log_loss_tolerance=-1.0
+    )
+    assert not model_card.incremental_update["is_update"]
+    assert model.pipeline.named_steps["cat_boost_classifier"].tree_count_ == (
+        tree_count + 5
+    )
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from src.app.model import ModelClassificationCatBoost
+from src.app.model_compiled import ModelCompiled
+from src.app.schema_pydantic import Transaction
+from tests.fixture_set import get_df_random, model_catboost
+
+
+@pytest.mark.parametrize("is_token_count_direct", [False, True])
+def test_parity(is_token_count_direct):
+    model = ModelClassificationCatBoost(is_token_count_direct=is_token_count_direct)
+    model.train_and_evaluate(
+        df_train=get_df_random(count=100), df_test=get_df_random(count=50)
+    )
+    df = get_df_random(count=200)
+
+    model_compiled = ModelCompiled.from_model(model=model)
+
+    np.testing.assert_allclose(
+        model_compiled.predict_proba_batch(df=df),
+        model.predict_proba_batch(df=df),
+    )
+
+
+def test_persistence(model_catboost, tmp_path):
+    path = str(tmp_path / "model_compiled.joblib")
+    df = get_df_random(count=10)
+    model_compiled = ModelCompiled.from_model(model=model_catboost)
+
+    model_compiled.save(path=path)
+    model_loaded = ModelCompiled.load(path=path)
+
+    np.testing.assert_allclose(
+        model_loaded.predict_proba_batch(df=df),
+        model_compiled.predict_proba_batch(df=df),
+    )
+    assert model_loaded.predict_proba(X=df.iloc[0].to_dict()) == pytest.approx(
+        model_compiled.predict_proba_batch(df=df)[0]
+    )
+
+
+def test_load_mmap(model_catboost, tmp_path):
+    path = str(tmp_path / "model_compiled.joblib")
+    df = get_df_random(count=10)
+    model_compiled = ModelCompiled.from_model(model=model_catboost)
+    model_compiled.save(path=path)
+
+    model_loaded = ModelCompiled.load(path=path, mmap_mode="r")
+
+    assert isinstance(model_loaded.lda_exp_topic_word, np.memmap)
+    assert isinstance(model_loaded.tree_list[0].threshold.base, np.memmap)
+    assert len(model_loaded.tree_list) == len(model_compiled.tree_list)
+    np.testing.assert_array_equal(
+        model_loaded.predict_proba_batch(df=df),
+        model_compiled.predict_proba_batch(df=df),
+    )
+
+    # re-export over the mapped artifact, as onto a served path
+    prob = model_loaded.predict_proba_batch(df=df)
+    model_compiled.lda_exp_topic_word = model_compiled.lda_exp_topic_word * 2
+    model_compiled.save(path=path)
+    np.testing.assert_array_equal(model_loaded.predict_proba_batch(df=df), prob)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["model_compiled.joblib"]
+    assert ModelCompiled.load(path=path, mmap_mode="r").lda_exp_topic_word[
+        0, 0
+    ] == pytest.approx(2 * model_loaded.lda_exp_topic_word[0, 0])
+
+
+def test_predict_proba_short_code(model_catboost):
+    transaction = Transaction(id="id_1", amount=10, transaction_type="credit")
+    feature_dict = model_catboost.get_feature_dict(transaction=transaction)
+    model_compiled = ModelCompiled.from_model(model=model_catboost)
+
+    assert model_compiled.predict_proba(X=feature_dict) == pytest.approx(
+        model_catboost.predict_proba(X=feature_dict)
+    )
@@ -0,0 +1,31 @@
+import os
+
+from src.app.conf import Model
+from src.app.model import ModelClassification, ModelClassificationCatBoost
+from src.app.model_registry import ModelRegistry
+
+
+def test_rule_model_without_artifact():
+    registry = ModelRegistry(conf=Model(path=None))
+
+    model = registry.get()
+
+    assert type(model) is ModelClassification
+    assert registry.get() is model
+
+
+def test_load_once_and_hot_reload(tmp_path):
+    path = str(tmp_path / "model.joblib")
+    ModelClassificationCatBoost().save(path=path)
+
+    registry = ModelRegistry(conf=Model(path=path, reload_interval_s=0))
+    model = registry.get()
+
+    assert isinstance(model, ModelClassificationCatBoost)
+    assert registry.get() is model
+
+    ModelClassificationCatBoost().save(path=path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    assert registry.get() is not model
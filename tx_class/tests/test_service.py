@@ -1,4 +1,6 @@
 from fastapi.testclient import TestClient
+from src.app.metrics import stage_timer
+from src.app.schema_pydantic import Response
 from src.app.service import app
 
 client = TestClient(app)
@@ -30,3 +32,89 @@ def test_predict():
     assert "is_fraud_prob" in response_data
 
     assert response_data["id_request"] == id_request
+
+
+def test_predict_batch():
+    request_payload = [
+        {
+            "id": f"test_id_{i}",
+            "transaction": {"id": f"test_id_{i}", "amount": amount, "code": "a43"},
+        }
+        for i, amount in enumerate([15, 1500])
+    ]
+    response = client.post("/predict_batch", json=request_payload)
+
+    assert response.status_code == 200
+
+    response_data = response.json()
+    assert [r["id_request"] for r in response_data] == ["test_id_0", "test_id_1"]
+    assert [r["is_fraud_prob"] for r in response_data] == [0.1, 0.9]
+
+
+def test_metrics():
+    stage_timer.is_enabled = True
+    try:
+        client.post(
+            "/predict",
+            json={"id": "test_id", "transaction": {"id": "test_id", "amount": 15}},
+        )
+    finally:
+        stage_timer.is_enabled = False
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert 'tx_class_stage_duration_seconds_count{stage="predict_proba"}' in (
+        response.text
+    )
+
+
+def test_predict_invalid():
+    response = client.post("/predict", json={"id": "test_id"})
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "transaction"]
+
+
+def test_openapi_request_body():
+    openapi = app.openapi()
+
+    for path, schema in [
+        ("/predict", {"$ref": "#/components/schemas/Request"}),
+        ("/predict_batch", {"items": {"$ref": "#/components/schemas/Request"}}),
+    ]:
+        request_body = openapi["paths"][path]["post"]["requestBody"]
+        assert request_body["required"]
+        assert (
+            schema.items()
+            <= request_body["content"]["application/json"]["schema"].items()
+        )
+    schema_dict = openapi["components"]["schemas"]
+    assert schema_dict["Request"]["properties"]["transaction"] == {
+        "$ref": "#/components/schemas/Transaction"
+    }
+    assert "amount" in schema_dict["Transaction"]["properties"]
+
+
+def test_predict_handler_from_app_state():
+    async def predict_handler(request):
+        return Response(id="id_handler", id_request=request.id, is_fraud_prob=0.5)
+
+    app.state.predict_handler = predict_handler
+    try:
+        response = client.post(
+            "/predict", json={"id": "test_id", "transaction": {"id": "test_id"}}
+        )
+    finally:
+        del app.state.predict_handler
+
+    assert response.json() == {
+        "id": "id_handler",
+        "id_request": "test_id",
+        "is_fraud_prob": 0.5,
+    }
+    assert (
+        client.post(
+            "/predict", json={"id": "test_id", "transaction": {"id": "test_id"}}
+        ).json()["id"]
+        != "id_handler"
+    )
@@ -1,7 +1,17 @@
+import re
 import shutil
 
+import pandas as pd
+from src.app.conf import State
+from src.app.feature_state import FeatureState
 from src.app.model import ModelClassification
-from src.app.train.data import Data, TransactionRandom
+from src.app.schema_pydantic import AMOUNT_MISSING, TransactionLabeled
+from src.app.train.data import (
+    TRANSACTION_SCHEMA,
+    Data,
+    TransactionRandom,
+    get_transaction_df_random,
+)
 from tests.fixture_set import spark
 
 
@@ -9,6 +19,29 @@ def test_basic():
     assert TransactionRandom().code is not None
 
 
+def test_get_transaction_df_random():
+    df = get_transaction_df_random(count=10, seed=[0, 1])
+
+    assert df.equals(get_transaction_df_random(count=10, seed=[0, 1]))
+    assert not df.equals(get_transaction_df_random(count=10, seed=[0, 2]))
+    for record in df.to_dict(orient="records"):
+        TransactionLabeled(**record)
+
+
+def test_build_random_parquet(spark):
+    count = 11
+    path = "test_build_random_parquet.parquet"
+
+    data = Data(spark=spark)
+    remove_if_exists(path=path)
+    data.build_random_parquet(count=count, path=path, partition_count=3)
+    data.load(path=path)
+
+    assert data.transaction_rdd.count() == count
+    assert data.transaction_rdd.select("id").distinct().count() == count
+    remove_if_exists(path=path)
+
+
 def test_build_random(spark):
     count = 3
 
@@ -34,6 +67,100 @@ def test_persistence(spark):
     data.load(path=path)
 
     assert data.transaction_rdd.count() == count
+    assert "date" in data.transaction_rdd.columns
+    remove_if_exists(path=path)
+
+
+def test_get_df_parity(spark):
+    data = Data(spark=spark)
+    data.build_random(count=20)
+    data.transaction_rdd.cache()
+
+    data.get_df()
+    assert data.df.columns == sorted(data.df.columns)
+    row_list = data.df.drop("date").collect()
+    data.get_df_python(model=ModelClassification())
+    row_list_python = data.df.collect()
+
+    assert data.df.columns == sorted(data.df.columns)
+    assert sorted(map(lambda r: sorted(r.asDict().items()), row_list)) == sorted(
+        map(lambda r: sorted(r.asDict().items()), row_list_python)
+    )
+
+
+def test_get_df_state_parity(spark):
+    state_conf = State(is_enabled=True, window_s_list=[3600, 86400])
+    df_transaction = get_transaction_df_random(count=2000, seed=0).sort_values("dtime")
+    df_transaction.loc[df_transaction.index[::10], "amount"] = AMOUNT_MISSING
+
+    data = Data(spark=spark)
+    data.transaction_rdd = spark.createDataFrame(
+        df_transaction, schema=TRANSACTION_SCHEMA
+    )
+    data.get_df(state_conf=state_conf)
+    df = data.df.toPandas()
+
+    transaction_list = [
+        TransactionLabeled(**record) for record in df_transaction.to_dict("records")
+    ]
+    df_serving = pd.DataFrame(
+        FeatureState(conf=state_conf).get_feature_array_dict(
+            transaction_list=transaction_list
+        )
+    )
+    df_serving["amount"] = df_transaction["amount"].to_numpy()
+    df_serving["dt_hour"] = [int(t.dtime[11:13]) for t in transaction_list]
+    df_serving["dt_day"] = [int(t.dtime[8:10]) for t in transaction_list]
+
+    # rows of equal amount are ordered by the state sums, which Spark and
+    # FeatureState add up in different orders: sorted on rounded values,
+    # compared as is
+    col_list = sorted(df_serving.columns)
+
+    def get_df_sorted(df: pd.DataFrame) -> pd.DataFrame:
+        index = df[col_list].round(6).sort_values(col_list).index
+        return df.loc[index, col_list].reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(
+        get_df_sorted(df), get_df_sorted(df_serving), check_dtype=False
+    )
+
+
+def test_data_split_partition(spark):
+    count = 20
+    path = "test_data_split_partition.parquet"
+
+    data = Data(spark=spark)
+    remove_if_exists(path=path)
+    data.build_random_parquet(count=count, path=path, partition_count=2)
+    data.load(path=path)
+    data.get_df()
+
+    data.split(test_min_dtime="2024-01-01")
+
+    plan = data.df_test._jdf.queryExecution().executedPlan().toString()
+    assert re.search(r"PartitionFilters: \[[^\]]*date", plan)
+    assert "date" not in data.df_test.columns
+    assert data.df_train.count() + data.df_test.count() == count
+    assert data.df_test.filter("dt_year < 2024").count() == 0
+    remove_if_exists(path=path)
+
+
+def test_get_batch_iter(spark):
+    count = 20
+    path = "test_get_batch_iter.parquet"
+
+    data = Data(spark=spark)
+    data.build_random(count=count)
+    data.get_df()
+
+    remove_if_exists(path=path)
+    batch_iter = data.get_batch_iter(df=data.df, path=path, batch_size=7)
+    df_list = list(batch_iter())
+
+    assert max(map(len, df_list)) <= 7
+    assert sum(map(len, df_list)) == count
+    assert sum(map(len, batch_iter())) == count
     remove_if_exists(path=path)
 
 
@@ -42,7 +169,7 @@ def test_data_spit(spark):
 
     data = Data(spark=spark)
     data.build_random(count=count)
-    data.get_df(model=ModelClassification())
+    data.get_df()
     data.df.show()
 
     data.split(test_min_dtime="2024-01-01")
@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+from src.app.conf import Worker
+from src.app.worker_pool import OverloadError, WorkerPool
+
+
+def sleep(duration_s: float) -> float:
+    time.sleep(duration_s)
+    return duration_s
+
+
+def get_status_list(worker_pool: WorkerPool, duration_s: float, count: int):
+    async def run():
+        return await asyncio.gather(
+            *(worker_pool.run(fn=sleep, duration_s=duration_s) for _ in range(count)),
+            return_exceptions=True,
+        )
+
+    return [
+        r.status_code if isinstance(r, OverloadError) else 200
+        for r in asyncio.run(run())
+        if r == duration_s or isinstance(r, OverloadError)
+    ]
+
+
+def test_run():
+    worker_pool = WorkerPool(conf=Worker(worker_count=2))
+
+    assert asyncio.run(worker_pool.run(fn=sleep, duration_s=0.01)) == 0.01
+    assert worker_pool.pending_count == 0
+
+
+def test_queue_full():
+    worker_pool = WorkerPool(conf=Worker(worker_count=1, max_queue_size=1))
+
+    status_list = get_status_list(worker_pool=worker_pool, duration_s=0.05, count=4)
+    assert status_list == [200, 200, 429, 429]
+
+
+def test_queue_timeout():
+    worker_pool = WorkerPool(
+        conf=Worker(worker_count=1, max_queue_size=2, queue_timeout_s=0.02)
+    )
+
+    status_list = get_status_list(worker_pool=worker_pool, duration_s=0.05, count=3)
+    assert status_list == [200, 503, 503]
+
+
+def test_queue_timeout_fast():
+    worker_pool = WorkerPool(
+        conf=Worker(worker_count=1, max_queue_size=2, queue_timeout_s=0.02)
+    )
+
+    async def run():
+        task = asyncio.ensure_future(worker_pool.run(fn=sleep, duration_s=0.5))
+        await asyncio.sleep(0.01)
+        time_start = time.perf_counter()
+        try:
+            await worker_pool.run(fn=sleep, duration_s=0.01)
+        except OverloadError as e:
+            status_code = e.status_code
+        duration_s = time.perf_counter() - time_start
+        await task
+        return status_code, duration_s
+
+    status_code, duration_s = asyncio.run(run())
+    # refused once over the timeout, not once the worker is free
+    assert status_code == 503
+    assert duration_s < 0.3
+    assert worker_pool.pending_count == 0